@@ -1,22 +1,41 @@
 import streamlit as st
-from service import file_uploader
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mytasks'))
+from task_3 import DocumentProcessor
+from task_4 import get_embedding_client
+from task_5 import ChromaCollectionCreator
+
+embed_config = {
+    "model_name": "textembedding-gecko@003",
+    "project": "quizify-428719",
+    "location": "europe-west2"
+}
 
 ####### SCREEN 1
 st.title("Screen 1")
 
 with st.form("Load Data"):
     # PDF file loader for Screen 1
-    
+    processor = DocumentProcessor()
+    embed_client = get_embedding_client(**embed_config)  # Mount embeddings function for Chroma TASK 1
+    chroma_creator = ChromaCollectionCreator(processor, embed_client)
+
     # TASK 2: VectorStore Information
-    if load_documents(): # Load if there are existing db/ and files
-        read_from_chroma()      # Instantiate and Read from Chroma  
-        ask_for_more_documents  # Ask if there are more documents to ingest
-    else:
-        mount_google_embedder() # Mount embeddings function for Chroma TASK 1
-        ingest_documents()      # Ingest if there are no existing db/ and files TASK 2
-        embed_to_chroma()       # Embed and Store into VectorStore, return Vector Store
-    
-    st.form_submit_button("Submit")
+    try:
+        loaded = chroma_creator.load_chroma_collection() # Load if there are existing db/ and files
+    except ValueError as e:  # The directory holds another vector store backend's collections
+        st.error(f"Cannot open the indexed documents: {str(e)}", icon="🚨")
+        loaded = False
+    if loaded:
+        # Read from the persisted Chroma collection and ask if there are more documents to ingest
+        st.write(f"Indexed documents: {', '.join(chroma_creator.document_names())}")
+        st.write("Upload more documents to add them to the collection")
+    processor.ingest_documents()  # Ingest uploaded documents TASK 2
+
+    if st.form_submit_button("Submit") and processor.pages:
+        chroma_creator.create_chroma_collection(prune=False)  # Embed and Store new documents into VectorStore
 
 ####### SCREEN 2
-# Task 3: 
\ No newline at end of file
+# Task 3:
@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQuiz:
+    """
+    Generates a quiz on a background thread and publishes each question to a queue as soon as
+    it is accepted, so the first question can be shown while the rest are still generating.
+
+    The owner calls heartbeat() while it is still interested (e.g. on every Streamlit rerun).
+    Generation is cancelled by cancel(), or on its own once no heartbeat has arrived for
+    idle_timeout seconds, e.g. because the user closed the session.
+    """
+    def __init__(self, generator, pool=None, corpus_fingerprint=None, idle_timeout=300, **generate_kwargs):
+        """
+        :param generator: The QuizGenerator to run.
+        :param pool: Optional QuestionPool; with corpus_fingerprint, the quiz is served from or added to it.
+        :param corpus_fingerprint: Identifies the indexed documents for the question pool.
+        :param idle_timeout: Seconds without a heartbeat after which generation is cancelled.
+        :param generate_kwargs: Passed on to generate_quiz.
+        """
+        self.generator = generator
+        self.pool = pool
+        self.corpus_fingerprint = corpus_fingerprint
+        self.idle_timeout = idle_timeout
+        self.generate_kwargs = generate_kwargs
+        self.error = None
+
+        self._queue = queue.Queue()
+        self._published = 0
+        self._done = threading.Event()
+        self._cancel = threading.Event()
+        self._last_heartbeat = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="background-quiz", daemon=True)
+
+    def start(self):
+        self.generator.on_question = self._publish
+        self.generator.cancel_event = self._cancel
+        self._thread.start()
+        threading.Thread(target=self._watch_heartbeat, name="background-quiz-watchdog", daemon=True).start()
+        return self
+
+    def _publish(self, question):
+        self._published += 1
+        self._queue.put(question)
+
+    def _run(self):
+        try:
+            if self.pool is not None:
+                self.generator.generate_quiz_from_pool(self.pool, self.corpus_fingerprint, **self.generate_kwargs)
+            else:
+                self.generator.generate_quiz(**self.generate_kwargs)
+            # Questions served from the pool were never generated, so publish them now
+            for question in self.generator.question_bank[self._published:]:
+                self._publish(question)
+        except Exception as e:
+            logger.error(f"Background quiz generation failed: {e}")
+            self.error = e
+        finally:
+            self._done.set()
+
+    def _watch_heartbeat(self):
+        while not self._done.wait(timeout=min(5.0, self.idle_timeout)):
+            if time.monotonic() - self._last_heartbeat > self.idle_timeout:
+                logger.debug("No heartbeat from the session, cancelling quiz generation")
+                self.cancel()
+                return
+
+    def heartbeat(self):
+        self._last_heartbeat = time.monotonic()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def poll(self) -> list:
+        """
+        Returns the questions published since the last poll, without blocking.
+        """
+        questions = []
+        while True:
+            try:
+                questions.append(self._queue.get_nowait())
+            except queue.Empty:
+                return questions
+
+    def wait(self, timeout=None):
+        """
+        Blocks until at least one new question is published or generation ends, then returns
+        the questions published since the last poll.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            questions = self.poll()
+            if questions or self.done:
+                return questions + self.poll()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            try:
+                questions.append(self._queue.get(timeout=0.1 if remaining is None else min(0.1, remaining)))
+                return questions + self.poll()
+            except queue.Empty:
+                continue
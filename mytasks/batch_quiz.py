@@ -0,0 +1,268 @@
+"""
+Headless bulk quiz generation over a directory of PDFs.
+
+Ingests every PDF under a directory, incrementally updates the Chroma collection, then
+generates a quiz per topic on a thread pool and appends one JSON line per quiz to the output
+file. Topics with a complete quiz of the same size already in the output are skipped, so an
+interrupted run picks up where it stopped when started again with the same arguments (write
+to a new output file to regenerate quizzes after the documents change):
+
+    python batch_quiz.py ../pdfs --topics "cell respiration" "photosynthesis" -n 10 -o quizzes.jsonl
+    python batch_quiz.py ../pdfs --topics-file topics.txt -o quizzes.jsonl --pool
+
+Page, embedding and Chroma state are cached on disk, so re-ingesting unchanged PDFs is cheap.
+With --fake, the collection and question pool go to a scratch directory unless
+--persist-directory names another one, so fake embeddings never reach the app's collection.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from headless import EMBED_CONFIG, LogNotifier
+from task_3 import DocumentProcessor
+from task_4 import get_embedding_client
+from task_5 import CHROMA_DIR, FLAT_DIR, VECTOR_BACKEND, ChromaCollectionCreator
+from task_8 import QUESTION_POOL_PATH, QuizGenerator
+from question_pool import QuestionPool, normalize_topic
+
+logger = logging.getLogger("batch_quiz")
+
+
+def find_pdfs(directory) -> list:
+    """
+    Returns the paths of the PDFs under directory, recursively, in a stable order.
+    """
+    paths = []
+    for root, _, names in os.walk(directory):
+        paths += [os.path.join(root, name) for name in names if name.lower().endswith(".pdf")]
+    return sorted(paths)
+
+
+def load_completed(output_path) -> set:
+    """
+    Returns the (normalized topic, question count) keys of the complete quizzes already in the
+    output file. A truncated last line from an interrupted run is ignored.
+    """
+    completed = set()
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("complete"):
+                    completed.add((normalize_topic(record["topic"]), record["num_questions"]))
+    except OSError:
+        pass
+    return completed
+
+
+class JsonlWriter:
+    """
+    Appends records to a JSONL file from several threads, syncing each line to disk so a
+    crash loses at most the quiz being written.
+    """
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class BatchQuizRunner:
+    """
+    Runs ingestion and quiz generation without any Streamlit calls, reusing DocumentProcessor,
+    ChromaCollectionCreator and QuizGenerator.
+    """
+    def __init__(self, embed_client, persist_directory=None, llm=None, pool=None, max_workers=4, mode="single", backend=None):
+        """
+        :param embed_client: The embedding client for the Chroma collection.
+        :param persist_directory: Directory of the persisted collection; defaults to the backend's.
+        :param llm: Optional LLM for every QuizGenerator (e.g. fake_backends.FakeLLM); defaults to Vertex AI.
+        :param pool: Optional QuestionPool complete quizzes are added to, so the app serves them.
+        :param max_workers: Number of topics generated at once.
+        :param mode: Generation mode passed to generate_quiz ("single" or "batch").
+        :param backend: Vector store backend ("chroma" or "flat"); defaults to task_5.VECTOR_BACKEND.
+        """
+        self.processor = DocumentProcessor()
+        self.creator = ChromaCollectionCreator(
+            self.processor, embed_client, persist_directory, notifier=LogNotifier(), backend=backend
+        )
+        self.llm = llm
+        self.pool = pool
+        self.max_workers = max_workers
+        self.mode = mode
+
+    def ingest(self, pdf_paths, prune=False):
+        """
+        Extracts the PDFs and brings the Chroma collection up to date with them.
+
+        :param prune: Delete documents from the collection that are not among pdf_paths.
+        :return: The collection update report, or None if pdf_paths held no pages (processor.pages
+            is empty) or indexing them failed.
+        """
+        files = []
+        for path in pdf_paths:
+            with open(path, "rb") as f:
+                files.append((os.path.basename(path), f.read()))
+
+        def on_progress(file_index, source, num_pages):
+            logger.info(f"Extracted {source} ({num_pages} pages)")
+
+        self.processor.process_files(files, on_progress=on_progress)
+        if not self.processor.pages:
+            self.creator.load_chroma_collection()
+            return None
+        return self.creator.create_chroma_collection(prune=prune)
+
+    def generate(self, topics, num_questions, writer, completed=frozenset()) -> dict:
+        """
+        Generates a quiz for every topic not in completed and writes each to writer as it finishes.
+
+        :return: Totals of quizzes, questions, skipped topics and questions per minute.
+        """
+        fingerprint = self.creator.corpus_fingerprint()
+        pending = [topic for topic in dict.fromkeys(topics) if (normalize_topic(topic), num_questions) not in completed]
+        skipped = len(topics) - len(pending)
+        if skipped:
+            logger.info(f"Skipping {skipped} topics already in the output")
+
+        totals = {"quizzes": 0, "questions": 0, "incomplete": 0, "failed": 0, "skipped": skipped}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            futures = {executor.submit(self._generate_topic, topic, num_questions, fingerprint): topic for topic in pending}
+            for future in as_completed(futures):
+                topic = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    logger.error(f"Quiz generation failed for {topic!r}: {e}")
+                    totals["failed"] += 1
+                    continue
+                writer.write(record)
+                totals["quizzes"] += 1
+                totals["questions"] += len(record["questions"])
+                totals["incomplete"] += not record["complete"]
+                logger.info(f"{topic!r}: {len(record['questions'])}/{num_questions} questions")
+
+        totals["seconds"] = time.perf_counter() - start
+        totals["questions_per_minute"] = 60 * totals["questions"] / totals["seconds"] if totals["seconds"] else 0.0
+        return totals
+
+    def _generate_topic(self, topic, num_questions, fingerprint) -> dict:
+        generator = QuizGenerator(topic, num_questions, self.creator)
+        if self.llm is not None:
+            generator.llm = self.llm
+        questions = generator.generate_quiz(mode=self.mode)
+        if self.pool is not None and len(questions) >= num_questions:
+            self.pool.add(fingerprint, topic, generator.prompt_version, questions)
+        return {
+            "topic": topic,
+            "num_questions": num_questions,
+            "corpus_fingerprint": fingerprint,
+            "prompt_version": generator.prompt_version,
+            "complete": len(questions) >= num_questions,
+            "questions": questions,
+            "stats": generator.stats,
+        }
+
+
+def read_topics(args) -> list:
+    topics = list(args.topics or [])
+    if args.topics_file:
+        with open(args.topics_file, "r", encoding="utf-8") as f:
+            topics += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return topics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate quizzes for many topics from a directory of PDFs.")
+    parser.add_argument("pdf_dir", help="Directory searched recursively for PDFs")
+    parser.add_argument("--topics", nargs="*", help="Quiz topics")
+    parser.add_argument("--topics-file", help="File with one topic per line")
+    parser.add_argument("-n", "--num-questions", type=int, default=10, help="Questions per quiz (at most 10)")
+    parser.add_argument("-o", "--output", default="quizzes.jsonl", help="JSONL file the quizzes are appended to")
+    parser.add_argument("--workers", type=int, default=4, help="Topics generated at once")
+    parser.add_argument("--mode", choices=["single", "batch"], default="single", help="Generation mode")
+    parser.add_argument("--persist-directory", help="Collection directory (defaults to the backend's)")
+    parser.add_argument("--backend", choices=["chroma", "flat"], default=VECTOR_BACKEND, help="Vector store backend")
+    parser.add_argument("--prune", action="store_true", help="Remove indexed documents that are not in pdf_dir")
+    parser.add_argument("--pool", action="store_true", help="Also add the questions to the app's question pool")
+    parser.add_argument("--fake", action="store_true",
+                        help="Use the offline fake backends, with a scratch collection and question pool")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    topics = read_topics(args)
+    if not topics:
+        parser.error("no topics given; use --topics or --topics-file")
+    if not 1 <= args.num_questions <= 10:
+        parser.error("--num-questions must be between 1 and 10")
+
+    pool_path = QUESTION_POOL_PATH
+    if args.fake:
+        from fake_backends import FakeLLM, fake_embedding_client
+        embed_client, llm = fake_embedding_client(), FakeLLM()
+        # Fake vectors and questions must never mix with the app's collections and pool
+        if args.persist_directory is None:
+            args.persist_directory = tempfile.mkdtemp(prefix="quizify-fake-")
+            logger.info(f"Using scratch directory {args.persist_directory}")
+        elif os.path.realpath(args.persist_directory) in {os.path.realpath(CHROMA_DIR), os.path.realpath(FLAT_DIR)}:
+            parser.error("--fake cannot write to the app's collection directory")
+        pool_path = os.path.join(args.persist_directory, "question_pool.sqlite3")
+    else:
+        embed_client, llm = get_embedding_client(**EMBED_CONFIG), None
+
+    runner = BatchQuizRunner(
+        embed_client,
+        persist_directory=args.persist_directory,
+        llm=llm,
+        pool=QuestionPool(pool_path) if args.pool else None,
+        max_workers=args.workers,
+        mode=args.mode,
+        backend=args.backend,
+    )
+
+    started = time.perf_counter()
+    report = runner.ingest(find_pdfs(args.pdf_dir), prune=args.prune)
+    if report is None and runner.processor.pages:
+        # The collection still open is the previous corpus, which the quizzes must not come from
+        logger.error("Indexing the documents failed; no quizzes generated")
+        sys.exit(1)
+    if report:
+        logger.info(f"Collection updated: {report['added']} chunks added, {report['deleted']} deleted, "
+                    f"{report['unchanged']} unchanged")
+    if not runner.creator.db:
+        logger.error("No documents indexed; nothing to generate quizzes from")
+        sys.exit(1)
+
+    writer = JsonlWriter(args.output)
+    try:
+        totals = runner.generate(topics, args.num_questions, writer, load_completed(args.output))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"{totals['quizzes']} quizzes, {totals['questions']} questions "
+        f"({totals['incomplete']} incomplete, {totals['failed']} failed, {totals['skipped']} skipped) "
+        f"in {elapsed:.1f}s: {totals['questions_per_minute']:.1f} questions/minute generating, "
+        f"{60 * totals['questions'] / elapsed:.1f} questions/minute overall"
+    )
+    sys.exit(1 if totals["failed"] else 0)
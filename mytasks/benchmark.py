@@ -0,0 +1,241 @@
+"""
+End-to-end pipeline benchmark against the offline fake backends.
+
+Runs the real DocumentProcessor -> ChromaCollectionCreator -> QuizGenerator -> QuizManager
+path on synthetic PDFs, with FakeEmbeddings and FakeLLM in place of Vertex AI, and reports
+per-stage throughput, p50/p99 latency and peak RSS. Results can be saved as a baseline and
+later runs compared against it:
+
+    python benchmark.py --pages 200 --save-baseline baseline.json
+    python benchmark.py --pages 200 --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+_WORDS = (
+    "cell membrane protein enzyme energy glucose oxygen carbon nucleus ribosome mitochondria "
+    "chlorophyll photosynthesis respiration molecule reaction substrate catalyst gradient "
+    "transport diffusion osmosis signal receptor pathway cycle acid base electron proton"
+).split()
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_synthetic_pdf(num_pages, lines_per_page=40, words_per_line=12, seed=0) -> bytes:
+    """
+    Builds a minimal, valid PDF whose pages hold lines of random biology words, with a blank
+    line every 8 lines so the text splitter finds paragraph boundaries.
+    """
+    generator = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(num_pages):
+        lines = []
+        for line in range(lines_per_page):
+            words = " ".join(generator.choice(_WORDS) for _ in range(words_per_line))
+            lines.append(f"({_pdf_escape(words)}) Tj T*" + (" () Tj T*" if line % 8 == 7 else ""))
+        stream = ("BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_number = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_number
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{kid} 0 R" for kid in kids).encode(), num_pages)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class StageTimer:
+    """
+    Collects per-operation latencies and item counts for each pipeline stage.
+    """
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, stage, seconds, items):
+        entry = self.stages.setdefault(stage, {"latencies": [], "items": 0})
+        entry["latencies"].append(seconds)
+        entry["items"] += items
+
+    def time(self, stage, fn, items_of=lambda result: 1):
+        start = time.perf_counter()
+        result = fn()
+        self.record(stage, time.perf_counter() - start, items_of(result))
+        return result
+
+    def report(self) -> dict:
+        return {
+            stage: {
+                "operations": len(entry["latencies"]),
+                "items": entry["items"],
+                "throughput_per_s": entry["items"] / sum(entry["latencies"]) if sum(entry["latencies"]) else 0.0,
+                "p50_ms": percentile(entry["latencies"], 0.50) * 1000,
+                "p99_ms": percentile(entry["latencies"], 0.99) * 1000,
+                "peak_rss_mb": entry["peak_rss_mb"],
+            }
+            for stage, entry in self.stages.items()
+        }
+
+    def mark_rss(self, stage):
+        self.stages[stage]["peak_rss_mb"] = peak_rss_mb()
+
+
+def run_benchmark(files=4, pages=50, topics=5, questions=5, embed_latency=0.0, llm_latency=0.0, workers=None, seed=0) -> dict:
+    """
+    Runs every pipeline stage once on a cold cache and collection and returns the per-stage report.
+    """
+    # Imported here so callers can configure logging before task_9 touches session state on import
+    from fake_backends import FakeLLM, fake_embedding_client
+    from page_cache import PageCache
+    from task_3 import DocumentProcessor
+    from task_5 import ChromaCollectionCreator
+    from task_8 import QuizGenerator
+    from task_9 import QuizManager
+    import streamlit as st
+
+    workdir = tempfile.mkdtemp(prefix="quizify-bench-")
+    timer = StageTimer()
+    try:
+        uploads = [(f"synthetic_{index}.pdf", make_synthetic_pdf(pages, seed=seed + index)) for index in range(files)]
+        processor = DocumentProcessor(cache=PageCache(os.path.join(workdir, "page_cache")), max_workers=workers)
+        timer.time("ingest", lambda: processor.process_files(uploads), lambda _: len(processor.pages))
+        timer.mark_rss("ingest")
+
+        embed_client = fake_embedding_client(latency=embed_latency, seed=seed)
+        creator = ChromaCollectionCreator(processor, embed_client, persist_directory=os.path.join(workdir, "chroma_db"))
+        chunks = timer.time("split", creator.split_pages, len)
+        timer.mark_rss("split")
+        timer.time("embed_index", creator.create_chroma_collection, lambda report: report["added"] if report else 0)
+        timer.mark_rss("embed_index")
+
+        topic_names = [" ".join(random.Random(seed + index).sample(_WORDS, 2)) for index in range(topics)]
+        for topic in topic_names:
+            retriever = creator.as_retriever(search_kwargs={"k": 4})
+            timer.time("retrieve", lambda: retriever.invoke(topic), len)
+        timer.mark_rss("retrieve")
+
+        quizzes = []
+        for topic in topic_names:
+            generator = QuizGenerator(topic, questions, creator)
+            generator.llm = FakeLLM(latency=llm_latency, seed=seed)
+            quizzes.append(timer.time("generate", generator.generate_quiz, len))
+        timer.mark_rss("generate")
+
+        for quiz in quizzes:
+            manager = QuizManager(quiz)
+            st.session_state["question_index"] = 0
+
+            def grade():
+                for index in range(manager.total_questions):
+                    question = manager.get_question_at_index(index)
+                    manager.handle_submission_and_next_question(question["answer"])
+                    manager.next_question_index(1)
+                return manager.total_questions
+
+            timer.time("grade", grade, lambda graded: graded)
+        timer.mark_rss("grade")
+
+        return {
+            "config": {"files": files, "pages": pages, "topics": topics, "questions": questions,
+                       "embed_latency": embed_latency, "llm_latency": llm_latency, "chunks": len(chunks)},
+            "stages": timer.report(),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(current, baseline, tolerance=0.2) -> list:
+    """
+    Returns a description of every stage whose throughput dropped, or p99 latency or peak RSS
+    grew, by more than tolerance relative to the baseline.
+    """
+    regressions = []
+    for stage, metrics in current["stages"].items():
+        base = baseline["stages"].get(stage)
+        if not base:
+            continue
+        if base["throughput_per_s"] and metrics["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{stage}: throughput {metrics['throughput_per_s']:.1f}/s vs {base['throughput_per_s']:.1f}/s")
+        if base["p99_ms"] and metrics["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{stage}: p99 {metrics['p99_ms']:.1f} ms vs {base['p99_ms']:.1f} ms")
+        if base["peak_rss_mb"] and metrics["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{stage}: peak RSS {metrics['peak_rss_mb']:.0f} MB vs {base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def print_report(result):
+    print(f"Config: {json.dumps(result['config'])}")
+    print(f"{'stage':<12} {'ops':>5} {'items':>7} {'items/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak RSS MB':>12}")
+    for stage, metrics in result["stages"].items():
+        print(
+            f"{stage:<12} {metrics['operations']:>5} {metrics['items']:>7} {metrics['throughput_per_s']:>10.1f} "
+            f"{metrics['p50_ms']:>9.1f} {metrics['p99_ms']:>9.1f} {metrics['peak_rss_mb']:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the quiz pipeline against offline fake backends.")
+    parser.add_argument("--files", type=int, default=4, help="Number of synthetic PDFs")
+    parser.add_argument("--pages", type=int, default=50, help="Pages per synthetic PDF")
+    parser.add_argument("--topics", type=int, default=5, help="Number of quiz topics to retrieve and generate")
+    parser.add_argument("--questions", type=int, default=5, help="Questions per quiz")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Fake embedding latency per call (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake LLM latency per call (s)")
+    parser.add_argument("--workers", type=int, default=None, help="PDF parsing processes")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a baseline JSON file and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    # Keep the report readable: silence Streamlit's bare-mode warnings and task_9's debug logging
+    logging.disable(logging.WARNING)
+
+    result = run_benchmark(args.files, args.pages, args.topics, args.questions,
+                           args.embed_latency, args.llm_latency, args.workers)
+    print_report(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
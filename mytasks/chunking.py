@@ -0,0 +1,187 @@
+"""
+Offset-based chunking of extracted pages.
+
+Chunks are (document id, page, start, end) character spans over the original page text,
+produced in a single pass over each page without copying any text. A chunk's string is
+only built when it is materialized, e.g. just before it is embedded, so chunks already in
+the collection never allocate their text.
+
+The chunk boundaries follow CharacterTextSplitter's merge rules, so spans line up with the
+chunks (and start_index based chunk IDs) the splitter produced. Running this module
+benchmarks the two against each other:
+
+    python chunking.py --pages 20000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import deque
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SEPARATOR = "\n\n"
+
+
+class ChunkSpan(NamedTuple):
+    """
+    A chunk as a character range [start, end) of one page of one document.
+    """
+    doc_id: str
+    page: int
+    start: int
+    end: int
+
+
+def split_offsets(text, separator):
+    """
+    Yields the (start, end) offsets of the non-empty pieces of text between separators.
+    """
+    start, length, separator_length = 0, len(text), len(separator)
+    while start < length:
+        end = text.find(separator, start)
+        if end == -1:
+            end = length
+        if end > start:
+            yield start, end
+        start = end + separator_length
+
+
+def _strip(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if end > start else None
+
+
+class OffsetChunker:
+    """
+    Splits page texts into overlapping chunk spans of at most chunk_size characters,
+    cutting at separators and carrying up to chunk_overlap characters into the next chunk.
+    """
+    def __init__(self, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separator=SEPARATOR):
+        if chunk_overlap > chunk_size:
+            raise ValueError("chunk_overlap cannot be larger than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separator = separator
+
+    def spans(self, text):
+        """
+        Yields the (start, end) offsets of the chunks of one text, with surrounding whitespace excluded.
+        """
+        separator_length = len(self.separator)
+        current = deque()
+        total = 0
+        for start, end in split_offsets(text, self.separator):
+            length = end - start
+            if current and total + length + separator_length > self.chunk_size:
+                span = _strip(text, current[0][0], current[-1][1])
+                if span:
+                    yield span
+                # Keep a tail of pieces as the overlap with the next chunk
+                while total > self.chunk_overlap or (total > 0 and total + length + (separator_length if current else 0) > self.chunk_size):
+                    first_start, first_end = current.popleft()
+                    total -= first_end - first_start + (separator_length if current else 0)
+            current.append((start, end))
+            total += length + (separator_length if len(current) > 1 else 0)
+
+        if current:
+            span = _strip(text, current[0][0], current[-1][1])
+            if span:
+                yield span
+
+    def iter_chunks(self, pages):
+        """
+        Streams over page Documents, yielding (page, ChunkSpan) pairs. Pages are identified by
+        their source_hash and page metadata.
+        """
+        for page in pages:
+            doc_id, page_number = page.metadata["source_hash"], page.metadata["page"]
+            for start, end in self.spans(page.page_content):
+                yield page, ChunkSpan(doc_id, page_number, start, end)
+
+
+def materialize(page, span, chunk_id=None) -> "Document":
+    """
+    Builds the Document of a chunk: its text, the page's metadata (source, page) and the
+    chunk's start/end offsets for citations.
+    """
+    from langchain_core.documents import Document  # Deferred until the first chunk is materialized
+    metadata = {**page.metadata, "start_index": span.start, "end_index": span.end}
+    if chunk_id is not None:
+        metadata["chunk_id"] = chunk_id
+    return Document(page_content=page.page_content[span.start:span.end], metadata=metadata)
+
+
+def _synthetic_pages(num_pages, seed=0) -> list:
+    from langchain_core.documents import Document
+    generator = random.Random(seed)
+    words = "cell energy protein enzyme membrane glucose oxygen carbon nucleus gradient pathway signal".split()
+    pages = []
+    for page in range(num_pages):
+        paragraphs = [
+            " ".join(generator.choice(words) for _ in range(generator.randint(20, 120)))
+            for _ in range(generator.randint(3, 8))
+        ]
+        pages.append(Document(page_content="\n\n".join(paragraphs), metadata={"source": "synthetic.pdf", "source_hash": "h", "page": page}))
+    return pages
+
+
+def _measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+if __name__ == "__main__":
+    from langchain.text_splitter import CharacterTextSplitter
+
+    parser = argparse.ArgumentParser(description="Benchmark offset chunking against CharacterTextSplitter.")
+    parser.add_argument("--pages", type=int, default=20000, help="Synthetic pages to chunk")
+    parser.add_argument("--new-share", type=float, default=0.1,
+                        help="Share of chunks materialized, as when only new chunks are embedded")
+    args = parser.parse_args()
+
+    pages = _synthetic_pages(args.pages)
+    splitter = CharacterTextSplitter(separator=SEPARATOR, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                                     length_function=len, is_separator_regex=False, add_start_index=True)
+    chunker = OffsetChunker()
+
+    def split_documents():
+        return splitter.create_documents([page.page_content for page in pages], [page.metadata for page in pages])
+
+    def chunk_spans():
+        return list(chunker.iter_chunks(pages))
+
+    def chunk_and_materialize():
+        chunks = list(chunker.iter_chunks(pages))
+        return chunks, [materialize(page, span) for page, span in chunks[:int(len(chunks) * args.new_share)]]
+
+    documents, split_seconds, split_peak = _measure(split_documents)
+    spans, span_seconds, span_peak = _measure(chunk_spans)
+    _, partial_seconds, partial_peak = _measure(chunk_and_materialize)
+
+    matching = sum(
+        document.page_content == page.page_content[span.start:span.end] and document.metadata["start_index"] == span.start
+        for document, (page, span) in zip(documents, spans)
+    )
+    print(f"{len(pages)} pages, {len(documents)} splitter chunks, {len(spans)} spans, "
+          f"{matching / max(1, len(documents)):.2%} identical text and start_index")
+    print(f"{'method':<34} {'chunks/s':>10} {'seconds':>8} {'peak MB':>8}")
+    for name, seconds, peak in [
+        ("CharacterTextSplitter", split_seconds, split_peak),
+        ("OffsetChunker spans", span_seconds, span_peak),
+        (f"spans + materialize {args.new_share:.0%}", partial_seconds, partial_peak),
+    ]:
+        print(f"{name:<34} {len(spans) / seconds:>10.0f} {seconds:>8.2f} {peak / 2 ** 20:>8.1f}")
@@ -0,0 +1,131 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Vertex AI text embedding request limits
+MAX_INSTANCES_PER_REQUEST = 250
+MAX_TOKENS_PER_REQUEST = 20000
+
+# google.api_core exceptions worth retrying, matched by name so the SDK is not imported here
+_RETRYABLE_ERRORS = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError"}
+
+
+def estimate_tokens(text) -> int:
+    """
+    Rough token count used to keep requests under the provider's token limit.
+    """
+    return len(text) // 4 + 1
+
+
+def is_retryable(error) -> bool:
+    return type(error).__name__ in _RETRYABLE_ERRORS or "429" in str(error)
+
+
+def is_too_large(error) -> bool:
+    message = str(error).lower()
+    return type(error).__name__ == "InvalidArgument" and ("token" in message or "instances" in message)
+
+
+def make_batches(texts, max_instances=MAX_INSTANCES_PER_REQUEST, max_tokens=MAX_TOKENS_PER_REQUEST) -> list:
+    """
+    Groups the indexes of texts into batches that respect the instance and token limits.
+    """
+    batches, batch, batch_tokens = [], [], 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if batch and (len(batch) >= max_instances or batch_tokens + tokens > max_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(index)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BatchEmbedder:
+    """
+    Embeds large lists of texts by splitting them into provider-sized batches and sending
+    several batches at once on a bounded thread pool.
+
+    Throttling errors are retried with exponential backoff and jitter. A batch rejected as
+    too large is split in half and the instance limit lowered for later batches. A batch
+    that still fails leaves None in place of its vectors, so the other batches' results
+    are kept.
+    """
+    def __init__(self, embed_fn, max_instances=MAX_INSTANCES_PER_REQUEST, max_tokens=MAX_TOKENS_PER_REQUEST,
+                 max_concurrency=4, max_retries=5, base_delay=0.5, max_delay=30.0, sleep=time.sleep):
+        """
+        :param embed_fn: Callable taking a list of texts and returning one vector per text.
+        :param max_instances: Maximum number of texts per request.
+        :param max_tokens: Maximum estimated tokens per request.
+        :param max_concurrency: Number of requests in flight at once.
+        :param max_retries: Number of retries for a throttled or unavailable request.
+        :param base_delay: First backoff delay in seconds, doubled on every retry.
+        :param max_delay: Upper bound on a single backoff delay in seconds.
+        :param sleep: Sleep function, replaceable in tests.
+        """
+        self.embed_fn = embed_fn
+        self.max_instances = max_instances
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failed_batches = 0
+
+    def call_with_retries(self, fn, *args):
+        """
+        Calls fn(*args), retrying retryable errors with exponential backoff.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._lock:
+                    self.requests += 1
+                return fn(*args)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                self.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _embed_batch(self, texts) -> list:
+        try:
+            return list(self.call_with_retries(self.embed_fn, texts))
+        except Exception as e:
+            if is_too_large(e) and len(texts) > 1:
+                half = len(texts) // 2
+                with self._lock:
+                    self.max_instances = min(self.max_instances, half)
+                return self._embed_batch(texts[:half]) + self._embed_batch(texts[half:])
+
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+            with self._lock:
+                self.failed_batches += 1
+            return [None] * len(texts)
+
+    def embed(self, texts) -> list:
+        """
+        Returns one vector per text, with None for texts whose batch failed.
+        """
+        batches = make_batches(texts, self.max_instances, self.max_tokens)
+        results = [None] * len(texts)
+        if not batches:
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            futures = [(batch, executor.submit(self._embed_batch, [texts[index] for index in batch])) for batch in batches]
+            for batch, future in futures:
+                for index, vector in zip(batch, future.result()):
+                    results[index] = vector
+        return results
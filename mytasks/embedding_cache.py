@@ -0,0 +1,112 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class EmbeddingCache:
+    """
+    A persistent cache of embedding vectors keyed by (model name, SHA-256 of the text).
+
+    Vectors are stored as float32 blobs in a SQLite database, fronted by an in-process LRU
+    of the most recently used vectors. Lookups are batched so a list of texts costs a single
+    query per 500 keys, and only the misses need to be sent to the embedding provider.
+    """
+    _BATCH = 500  # Stay well under SQLite's bound-parameter limit
+
+    def __init__(self, db_path, memory_size=10000):
+        """
+        :param db_path: Path of the SQLite database file. Created if missing.
+        :param memory_size: Number of vectors kept in the in-process LRU layer.
+        """
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_name, texts) -> list:
+        """
+        Returns the cached vector for each text, or None where the text has not been embedded yet.
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for index, text_hash in enumerate(hashes):
+                vector = self._memory.get((model_name, text_hash))
+                if vector is not None:
+                    self._memory.move_to_end((model_name, text_hash))
+                    results[index] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(text_hash, []).append(index)
+
+            pending = list(missing)
+            for start in range(0, len(pending), self._BATCH):
+                batch = pending[start:start + self._BATCH]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model_name, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array("f", blob).tolist()
+                    self._remember((model_name, text_hash), vector)
+                    for index in missing.pop(text_hash):
+                        results[index] = vector
+                        self.disk_hits += 1
+
+            self.misses += sum(len(indexes) for indexes in missing.values())
+
+        return results
+
+    def put_many(self, model_name, texts, vectors):
+        """
+        Stores the vectors of the given texts. Texts whose vector is None are skipped.
+        """
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if vector is None:
+                    continue
+                text_hash = self.text_hash(text)
+                self._remember((model_name, text_hash), list(vector))
+                rows.append((model_name, text_hash, array("f", vector).tobytes()))
+
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters for this cache instance.
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from langchain_core.documents import Document
+from langchain_core.language_models.llms import LLM
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+
+class ResourceExhausted(Exception):
+    """
+    Stand-in for google.api_core.exceptions.ResourceExhausted (HTTP 429).
+    """
+
+
+class FakeEmbeddings:
+    """
+    A local stand-in for VertexAIEmbeddings that needs no network or credentials.
+
+    Vectors are derived deterministically from a hash of the text, so identical texts always
+    get identical vectors. Latency, random failures and throttling can be injected to exercise
+    batching and retry logic.
+    """
+    def __init__(self, dim=768, latency=0.0, failure_rate=0.0, throttle_rate=0.0, seed=0):
+        """
+        :param dim: Dimension of the returned vectors.
+        :param latency: Seconds to sleep per call.
+        :param failure_rate: Probability that a call raises a non-retryable RuntimeError.
+        :param throttle_rate: Probability that a call raises ResourceExhausted.
+        :param seed: Seed of the random generator used for injected errors.
+        """
+        self.model_name = "fake-embedding"
+        self.dim = dim
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        generator = random.Random(digest)
+        vector = [generator.gauss(0.0, 1.0) for _ in range(self.dim)]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _call(self, count):
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if roll < self.throttle_rate:
+            raise ResourceExhausted("429 Quota exceeded")
+        if roll < self.throttle_rate + self.failure_rate:
+            raise RuntimeError("Injected embedding failure")
+        with self._lock:
+            self.texts_embedded += count
+
+    def embed_documents(self, texts):
+        self._call(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self._call(1)
+        return self._vector(text)
+
+
+_SYLLABLES = ["ka", "lo", "mi", "tur", "sen", "pha", "dro", "vel", "qui", "zan", "bor", "ex", "ly", "os", "ten", "gra"]
+
+
+class FakeLLM(LLM):
+    """
+    A local stand-in for the VertexAI LLM that returns canned quiz questions as JSON.
+
+    Prompts asking for several questions ("create N different quiz questions") get a JSON
+    array of N questions, anything else a single JSON object. Each call sleeps for latency
+    plus token_latency per estimated output token. A failure_rate share of calls return text
+    that is not JSON, and a defect_rate share return JSON wrapped in a code fence with a
+    trailing comma, as LLMs often do.
+    """
+    latency: float = 0.0
+    token_latency: float = 0.0
+    failure_rate: float = 0.0
+    defect_rate: float = 0.0
+    seed: int = 0
+    _random: random.Random = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _counter: int = PrivateAttr(default=0)
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _question(self, topic):
+        with self._lock:
+            self._counter += 1
+            number = self._counter
+        # Random made-up words keep the canned questions distinct for near-duplicate detection
+        generator = random.Random(f"{self.seed}:{number}")
+        words = " ".join(
+            "".join(generator.choice(_SYLLABLES) for _ in range(generator.randint(2, 3))) for _ in range(6)
+        )
+        return {
+            "question": f"{topic}: which statement about {words} is correct?",
+            "choices": [{"key": key, "value": f"Statement {key} about {topic}"} for key in "ABCD"],
+            "answer": "ABCD"[number % 4],
+            "explanation": f"Statement {'ABCD'[number % 4]} is the one supported by the context.",
+        }
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs) -> str:
+        with self._lock:
+            if self._random is None:
+                self._random = random.Random(self.seed)
+            self.calls += 1
+            roll = self._random.random()
+        failed = roll < self.failure_rate
+        defective = not failed and roll < self.failure_rate + self.defect_rate
+
+        topic_match = re.search(r"topic: (.*)", prompt)
+        topic = topic_match.group(1).strip() if topic_match else "General Knowledge"
+        count_match = re.search(r"create (\d+) different quiz questions", prompt)
+
+        if failed:
+            response = "I'm sorry, I cannot create a quiz question from this context."
+        elif count_match:
+            response = json.dumps([self._question(topic) for _ in range(int(count_match.group(1)))])
+        else:
+            response = json.dumps(self._question(topic))
+        if defective:
+            response = f"```json\n{response[:-1]},{response[-1]}\n```"
+
+        time.sleep(self.latency + self.token_latency * (len(response) // 4 + 1))
+        return response
+
+
+def fake_embedding_client(dim=768, cache=None, **kwargs):
+    """
+    Returns a drop-in EmbeddingClient backed by FakeEmbeddings and, unless a cache is given,
+    an empty in-memory embedding cache.
+
+    :param kwargs: Passed on to FakeEmbeddings (latency, failure_rate, throttle_rate, seed).
+    """
+    from embedding_cache import EmbeddingCache
+    from task_4 import EmbeddingClient
+
+    return EmbeddingClient(
+        None, None, None,
+        cache=cache if cache is not None else EmbeddingCache(":memory:"),
+        client=FakeEmbeddings(dim=dim, **kwargs),
+    )
+
+
+class FakeVectorStore:
+    """
+    A minimal vectorstore stand-in whose retriever returns the first k of a fixed list of texts.
+    """
+    def __init__(self, texts):
+        self.docs = [Document(page_content=text) for text in texts]
+
+    def as_retriever(self, search_kwargs=None, **kwargs):
+        k = (search_kwargs or {}).get("k", 4)
+        return RunnableLambda(lambda query: self.docs[:k])
+
+
+def compare_generation_modes(num_questions=10, latency=0.8, token_latency=0.002):
+    """
+    Generates the same quiz in single and batch mode against FakeLLM and returns both modes'
+    stats, so the token and latency savings of batch mode can be compared.
+    """
+    from task_8 import QuizGenerator
+
+    store = FakeVectorStore([f"Passage {index} about photosynthesis. " * 40 for index in range(12)])
+    results = {}
+    for mode in ("single", "batch"):
+        generator = QuizGenerator("Photosynthesis", num_questions, store)
+        generator.llm = FakeLLM(latency=latency, token_latency=token_latency)
+        generator.generate_quiz(mode=mode)
+        results[mode] = {**generator.stats, "questions": len(generator.question_bank)}
+    return results
+
+
+if __name__ == "__main__":
+    results = compare_generation_modes()
+    for mode, stats in results.items():
+        print(mode, stats)
+
+    single, batch = results["single"], results["batch"]
+    for key in ("llm_calls", "prompt_tokens", "completion_tokens", "llm_seconds", "wall_seconds"):
+        saving = 1 - batch[key] / single[key] if single[key] else 0.0
+        print(f"{key}: single={single[key]:.2f} batch={batch[key]:.2f} saving={saving:.0%}")
@@ -0,0 +1,551 @@
+"""
+A flat, memory-mapped NumPy vector store for single-node deployments.
+
+Vectors are L2-normalized and appended to a raw matrix file that is memory-mapped for search;
+texts, metadata and IDs live in a small SQLite table keyed by matrix row. Top-k queries are
+cosine similarity computed with blocked matrix products, so a batch of queries shares one
+pass over the matrix.
+
+The scanned matrix is stored as float32, float16 or int8 (scalar quantization with one scale
+per vector), so a 768-dimensional Gecko embedding takes 3 KB, 1.5 KB or 772 bytes. Quantized
+stores keep a float32 copy on disk by default, which is only read to re-score the best
+k * RESCORE_OVERSAMPLE candidates of the scan in full precision; it never has to be resident.
+
+Appends only write the new rows. Deletes and updates tombstone the old rows, which
+compact() drops by writing a new generation of all files and switching to it atomically. The
+previous generation is kept for readers that still have it open, and removed by the next
+compact() or open.
+
+Running this module benchmarks the store against Chroma on write time, cold-open time,
+query latency, recall@k, disk size and RSS:
+
+    python flat_store.py --chunks 20000 --dim 768
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+STORE_NAME = "flat_store.json"
+BLOCK_ROWS = 8192  # Matrix rows scored per block, bounding the temporary float32 copy and score matrix
+CONVERT_ROWS = 256  # Quantized rows widened to float32 at a time while scoring a block
+RESCORE_OVERSAMPLE = 8  # Candidates per result re-scored in full precision by quantized stores
+DTYPES = ("float32", "float16", "int8")
+_GENERATION_FILE = re.compile(r"(?:vectors|scales|full|chunks)\.(\d+)\.(?:bin|sqlite3)(?:-wal|-shm)?")
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _encode(vectors, dtype, rescore) -> dict:
+    """
+    Encodes normalized float32 vectors into the rows of each matrix file of a store.
+    int8 rows are round(vector / scale) with scale = max(|vector|) / 127, so every row
+    uses the full int8 range.
+    """
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1, keepdims=True) / 127
+        scales[scales == 0] = 1
+        encoded = {"vectors": np.rint(vectors / scales).astype(np.int8), "scales": scales.astype(np.float32)}
+    else:
+        encoded = {"vectors": vectors.astype(dtype)}
+    if rescore:
+        encoded["full"] = vectors
+    return encoded
+
+
+def _top(scores, rows, keep):
+    """
+    Keeps the keep best-scoring (unsorted) columns of each row of scores.
+    """
+    keep = min(keep, scores.shape[1])
+    top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+    return np.take_along_axis(scores, top, axis=1), np.take_along_axis(rows, top, axis=1)
+
+
+class FlatVectorStore(VectorStore):
+    """
+    A LangChain VectorStore over a memory-mapped matrix of normalized vectors.
+    Relevance scores are cosine similarities.
+    """
+    def __init__(self, persist_directory, embedding, dtype="float32", rescore=None):
+        """
+        :param persist_directory: Directory of the matrix, metadata table and store header.
+        :param embedding: The embedding client used to embed added texts and queries.
+        :param dtype: "float32", "float16" or "int8" storage for new stores; existing stores keep theirs.
+        :param rescore: Keep float32 vectors on disk to re-score candidates in full precision.
+            Defaults to True for quantized dtypes. Existing stores keep their setting.
+        """
+        if np.dtype(dtype).name not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype}; expected one of {', '.join(DTYPES)}")
+        self.persist_directory = persist_directory
+        self._embedding = embedding
+        self._lock = threading.Lock()
+        os.makedirs(persist_directory, exist_ok=True)
+
+        try:
+            with open(self._path(STORE_NAME), "r", encoding="utf-8") as f:
+                self._header = json.load(f)
+        except (OSError, ValueError):
+            dtype = np.dtype(dtype).name
+            self._header = {
+                "generation": 0,
+                "dim": None,
+                "dtype": dtype,
+                "rescore": dtype != "float32" if rescore is None else bool(rescore),
+            }
+        self._open_generation()
+        self._remove_generations(self._header["generation"] - 1)
+
+    def _path(self, name):
+        return os.path.join(self.persist_directory, name)
+
+    def _chunks_path(self, generation):
+        return self._path(f"chunks.{generation}.sqlite3")
+
+    def _matrix_files(self, generation) -> dict:
+        """
+        Returns name -> (path, dtype, columns) of the row-aligned matrix files of a generation.
+        """
+        dim = self._header["dim"]
+        files = {"vectors": (self._path(f"vectors.{generation}.bin"), np.dtype(self._header["dtype"]), dim)}
+        if self._header["dtype"] == "int8":
+            files["scales"] = (self._path(f"scales.{generation}.bin"), np.dtype(np.float32), 1)
+        if self._header.get("rescore"):
+            files["full"] = (self._path(f"full.{generation}.bin"), np.dtype(np.float32), dim)
+        return files
+
+    def _open_generation(self):
+        self._conn = sqlite3.connect(self._chunks_path(self._header["generation"]), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL, "
+            "deleted INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS chunks_by_id ON chunks (id);"
+        )
+        rows = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+
+        # Rows appended to a matrix file but never committed to the table (a crash mid-append) are dropped
+        if self._header["dim"]:
+            for path, dtype, columns in self._matrix_files(self._header["generation"]).values():
+                if os.path.exists(path) and os.path.getsize(path) > rows * columns * dtype.itemsize:
+                    os.truncate(path, rows * columns * dtype.itemsize)
+
+        self._deleted = np.zeros(rows, dtype=bool)
+        self._deleted[[row for (row,) in self._conn.execute("SELECT row FROM chunks WHERE deleted = 1")]] = True
+        self._map_matrices(rows)
+
+    def _map_matrices(self, rows):
+        if rows and self._header["dim"]:
+            self._matrices = {
+                name: np.memmap(path, dtype=dtype, mode="r", shape=(rows, columns))
+                for name, (path, dtype, columns) in self._matrix_files(self._header["generation"]).items()
+            }
+        else:
+            self._matrices = {}
+
+    def _save_header(self):
+        temp_path = self._path(f"{STORE_NAME}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._header, f)
+        os.replace(temp_path, self._path(STORE_NAME))
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return int((~self._deleted).sum())
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs) -> list:
+        """
+        Embeds and appends the texts. Texts whose embedding failed (None) are skipped.
+        """
+        texts = list(texts)
+        return self.add_vectors(self._embedding.embed_documents(texts), texts, metadatas, ids)
+
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None) -> list:
+        """
+        Appends precomputed vectors with their texts. IDs already in the store are replaced.
+
+        :return: The IDs of the rows added.
+        """
+        metadatas = metadatas or [{}] * len(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        kept = [index for index, vector in enumerate(vectors) if vector is not None]
+        if not kept:
+            return []
+        matrix = _normalize([vectors[index] for index in kept])
+        encoded = _encode(matrix, self._header["dtype"], self._header.get("rescore"))
+
+        with self._lock:
+            if self._header["dim"] is None:
+                self._header["dim"] = matrix.shape[1]
+                self._save_header()
+            elif matrix.shape[1] != self._header["dim"]:
+                raise ValueError(f"Expected {self._header['dim']}-dimensional vectors, got {matrix.shape[1]}")
+
+            self._tombstone([ids[index] for index in kept])
+            first_row = len(self._deleted)
+            # Matrix rows are written before the table commit, so a crash leaves no dangling table rows
+            for name, (path, _, _) in self._matrix_files(self._header["generation"]).items():
+                with open(path, "ab") as f:
+                    f.write(encoded[name].tobytes())
+            self._conn.executemany(
+                "INSERT INTO chunks (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (first_row + offset, ids[index], texts[index], json.dumps(metadatas[index] or {}))
+                    for offset, index in enumerate(kept)
+                ],
+            )
+            self._conn.commit()
+            self._deleted = np.concatenate([self._deleted, np.zeros(len(kept), dtype=bool)])
+            self._map_matrices(len(self._deleted))
+        return [ids[index] for index in kept]
+
+    def _tombstone(self, ids):
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows = self._conn.execute(
+                f"UPDATE chunks SET deleted = 1 WHERE deleted = 0 AND id IN ({','.join('?' * len(batch))}) RETURNING row",
+                batch,
+            ).fetchall()
+            self._deleted[[row for (row,) in rows]] = True
+
+    def delete(self, ids=None, **kwargs):
+        with self._lock:
+            self._tombstone(list(ids or []))
+            self._conn.commit()
+        return True
+
+    def get(self, ids=None, include=None, **kwargs) -> dict:
+        """
+        Chroma-style lookup of stored chunks by ID (or all chunks), without embedding anything.
+
+        :return: A dict of "ids", "documents" and "metadatas" lists.
+        """
+        query = "SELECT id, text, metadata FROM chunks WHERE deleted = 0"
+        with self._lock:
+            if ids is None:
+                rows = self._conn.execute(query).fetchall()
+            else:
+                ids = list(ids)
+                rows = []
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    rows += self._conn.execute(f"{query} AND id IN ({','.join('?' * len(batch))})", batch).fetchall()
+        return {
+            "ids": [chunk_id for chunk_id, _, _ in rows],
+            "documents": [text for _, text, _ in rows],
+            "metadatas": [json.loads(metadata) for _, _, metadata in rows],
+        }
+
+    def get_by_ids(self, ids, /) -> list:
+        stored = self.get(ids=ids)
+        return [
+            Document(id=chunk_id, page_content=text, metadata=metadata)
+            for chunk_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        ]
+
+    def batch_search(self, query_vectors, k=4) -> list:
+        """
+        Cosine top-k for several query vectors in one pass over the matrix. Quantized stores
+        with rescoring scan for k * RESCORE_OVERSAMPLE candidates and rank those by their
+        full-precision scores.
+
+        :return: One list of (Document, cosine similarity) pairs per query, best first.
+        """
+        with self._lock:
+            matrices, deleted = self._matrices, self._deleted
+        queries = _normalize(query_vectors)
+        if not matrices or not len(queries):
+            return [[] for _ in queries]
+
+        rescore = "full" in matrices
+        best_scores, best_rows = self._scan(matrices, deleted, queries, k * RESCORE_OVERSAMPLE if rescore else k)
+        if rescore:
+            best_scores, best_rows = self._rescore(matrices["full"], queries, best_scores, best_rows, k)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        documents = self._documents_by_row({int(row) for row, score in zip(best_rows.flat, best_scores.flat) if score > -np.inf})
+        return [
+            [(documents[int(row)], float(score)) for row, score in zip(rows, scores) if score > -np.inf]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    @staticmethod
+    def _scan(matrices, deleted, queries, keep):
+        matrix, scales = matrices["vectors"], matrices.get("scales")
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        # Quantized rows are widened to float32 a few hundred at a time, so the copy stays in cache
+        buffer = np.empty((CONVERT_ROWS, matrix.shape[1]), dtype=np.float32) if matrix.dtype != np.float32 else None
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            block = matrix[start:start + BLOCK_ROWS]
+            if buffer is None:
+                scores = queries @ np.asarray(block).T
+            else:
+                scores = np.empty((len(queries), len(block)), dtype=np.float32)
+                for offset in range(0, len(block), CONVERT_ROWS):
+                    rows = min(CONVERT_ROWS, len(block) - offset)
+                    np.copyto(buffer[:rows], block[offset:offset + rows], casting="unsafe")
+                    np.matmul(queries, buffer[:rows].T, out=scores[:, offset:offset + rows])
+            if scales is not None:
+                scores *= scales[start:start + len(block), 0]
+            scores[:, deleted[start:start + len(block)]] = -np.inf
+            block_rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            best_scores, best_rows = _top(
+                np.concatenate([best_scores, scores], axis=1), np.concatenate([best_rows, block_rows], axis=1), keep
+            )
+        return best_scores, best_rows
+
+    @staticmethod
+    def _rescore(full, queries, scores, rows, k):
+        # Only the candidates' rows of the float32 file are read, in ascending order
+        unique_rows, positions = np.unique(rows, return_inverse=True)
+        candidates = np.asarray(full[unique_rows])[positions.reshape(rows.shape)]
+        exact = np.einsum("qcd,qd->qc", candidates, queries)
+        exact[scores == -np.inf] = -np.inf
+        return _top(exact, rows, k)
+
+    def _documents_by_row(self, rows) -> dict:
+        rows = list(rows)
+        if not rows:
+            return {}
+        with self._lock:
+            found = self._conn.execute(
+                f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({','.join('?' * len(rows))})", rows
+            ).fetchall()
+        return {row: Document(id=chunk_id, page_content=text, metadata=json.loads(metadata)) for row, chunk_id, text, metadata in found}
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, **kwargs) -> list:
+        return self.batch_search([embedding], k)[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs) -> list:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities; clip float error and opposite directions into [0, 1]
+        return lambda score: min(1.0, max(0.0, score))
+
+    def _remove_generations(self, before):
+        # Files of generations older than before, left for readers that had them open
+        for name in os.listdir(self.persist_directory):
+            match = _GENERATION_FILE.fullmatch(name)
+            if match and int(match.group(1)) < before:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+    def compact(self, keep_previous=True):
+        """
+        Drops tombstoned rows by writing the live rows to a new generation of the matrices and
+        table, then switching the header to it. The generation it replaces is kept, so readers
+        in other processes that still have it open are unaffected; older ones are removed.
+
+        :param keep_previous: Keep the replaced generation for readers that have it open. Pass
+            False when no one else can have opened the store yet.
+        """
+        with self._lock:
+            old_generation = self._header["generation"]
+            generation = old_generation + 1
+            live = np.flatnonzero(~self._deleted)
+            for name, (path, _, _) in self._matrix_files(generation).items():
+                with open(path, "wb") as f:
+                    if name in self._matrices:
+                        for start in range(0, len(live), BLOCK_ROWS):
+                            f.write(np.asarray(self._matrices[name][live[start:start + BLOCK_ROWS]]).tobytes())
+
+            conn = sqlite3.connect(self._chunks_path(generation))
+            conn.execute("ATTACH DATABASE ? AS old", (self._chunks_path(old_generation),))
+            conn.executescript(
+                "CREATE TABLE chunks ("
+                "row INTEGER PRIMARY KEY, id TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL, "
+                "deleted INTEGER NOT NULL DEFAULT 0);"
+                "CREATE INDEX chunks_by_id ON chunks (id);"
+                "INSERT INTO chunks (row, id, text, metadata) "
+                "SELECT ROW_NUMBER() OVER (ORDER BY row) - 1, id, text, metadata FROM old.chunks WHERE deleted = 0 ORDER BY row;"
+            )
+            conn.commit()
+            conn.close()
+
+            self._header["generation"] = generation
+            self._save_header()
+            self._conn.close()
+            self._open_generation()
+            self._remove_generations(old_generation if keep_previous else generation)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, persist_directory=None, dtype="float32",
+                   rescore=None, **kwargs):
+        store = cls(persist_directory, embedding, dtype=dtype, rescore=rescore)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss survives exec, so it would include the parent's peak; VmHWM is reset for the new process
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _benchmark_child(backend, directory, queries_path, k):
+    """
+    Opens a store written by the parent in a fresh process, runs the saved queries and reports
+    cold-open time, query latencies, peak RSS and the top-k IDs of each query as JSON.
+    """
+    import time
+
+    queries = np.load(queries_path)
+    start = time.perf_counter()
+    if backend == "chroma":
+        import chromadb
+        collection = chromadb.PersistentClient(path=directory).get_collection("bench")
+        search = lambda vectors: collection.query(query_embeddings=vectors.tolist(), n_results=k, include=[])["ids"]
+    else:
+        store = FlatVectorStore(directory, embedding=None)
+        search = lambda vectors: [[doc.id for doc, _ in results] for results in store.batch_search(vectors, k)]
+    search(queries[:1])
+    open_seconds = time.perf_counter() - start
+
+    latencies, top_ids = [], []
+    for vector in queries:
+        start = time.perf_counter()
+        top_ids += search(vector[None, :])
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    search(queries)
+    batch_seconds = time.perf_counter() - start
+
+    latencies.sort()
+    print(json.dumps({
+        "open_ms": open_seconds * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "batch_query_ms": batch_seconds * 1000 / len(queries),
+        "peak_rss_mb": _peak_rss_mb(),
+        "top_ids": top_ids,
+    }))
+
+
+def _directory_mb(directory) -> float:
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file()) / 2 ** 20 if os.path.isdir(directory) else 0.0
+
+
+if __name__ == "__main__":
+    import shutil
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark the flat vector store and its quantized modes against Chroma.")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--noise", type=float, default=1.0,
+                        help="Query noise relative to the stored vector it is drawn near; higher is harder")
+    parser.add_argument("--child", nargs=3, metavar=("BACKEND", "DIR", "QUERIES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _benchmark_child(args.child[0], args.child[1], args.child[2], args.k)
+        sys.exit(0)
+
+    generator = np.random.default_rng(0)
+    # Gecko embeddings are unit length, so Chroma's default L2 ranking matches cosine
+    vectors = _normalize(generator.standard_normal((args.chunks, args.dim), dtype=np.float32))
+    ids = [f"chunk-{index}" for index in range(args.chunks)]
+    texts = [f"chunk text {index}" for index in range(args.chunks)]
+    metadatas = [{"source": "bench.pdf", "page": index // 4} for index in range(args.chunks)]
+
+    # Queries are perturbed stored vectors, like a question about a passage, so the true
+    # neighbours stand out from the rest; ground truth is exact float32 cosine top-k
+    queries = vectors[generator.integers(0, args.chunks, args.queries)]
+    queries = _normalize(queries + args.noise * generator.standard_normal(queries.shape, dtype=np.float32) / np.sqrt(args.dim))
+    exact_scores = queries @ vectors.T
+    exact = [{ids[row] for row in np.argpartition(-scores, args.k - 1)[:args.k]} for scores in exact_scores]
+    del exact_scores
+
+    backends = {
+        "chroma": None,
+        "flat": {"dtype": "float32"},
+        "flat-float16": {"dtype": "float16"},
+        "flat-int8": {"dtype": "int8"},
+        "flat-int8-raw": {"dtype": "int8", "rescore": False},
+    }
+    workdir = tempfile.mkdtemp(prefix="quizify-flat-")
+    try:
+        queries_path = os.path.join(workdir, "queries.npy")
+        np.save(queries_path, queries)
+        results = {}
+        for backend, options in backends.items():
+            directory = os.path.join(workdir, backend)
+            start = time.perf_counter()
+            if options is None:
+                import chromadb
+                collection = chromadb.PersistentClient(path=directory).create_collection("bench")
+                for batch in range(0, args.chunks, 1000):
+                    collection.add(ids=ids[batch:batch + 1000], embeddings=vectors[batch:batch + 1000].tolist(),
+                                   documents=texts[batch:batch + 1000], metadatas=metadatas[batch:batch + 1000])
+                scanned_mb = sum(
+                    entry.stat().st_size for path, _, files in os.walk(directory) for entry in os.scandir(path)
+                    if entry.is_file() and entry.name.endswith(".bin")
+                ) / 2 ** 20
+            else:
+                store = FlatVectorStore(directory, embedding=None, **options)
+                for batch in range(0, args.chunks, 1000):
+                    store.add_vectors(vectors[batch:batch + 1000], texts[batch:batch + 1000],
+                                      metadatas[batch:batch + 1000], ids[batch:batch + 1000])
+                scanned_mb = sum(
+                    os.path.getsize(path) for name, (path, _, _) in store._matrix_files(store._header["generation"]).items()
+                    if name != "full"
+                ) / 2 ** 20
+            write_seconds = time.perf_counter() - start
+            child = subprocess.run(
+                [sys.executable, __file__, "-k", str(args.k),
+                 "--child", "chroma" if options is None else "flat", directory, queries_path],
+                capture_output=True, text=True, check=True,
+            )
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            result["recall"] = sum(len(exact[index] & set(top)) for index, top in enumerate(result.pop("top_ids"))) / (args.k * args.queries)
+            disk_mb = sum(_directory_mb(path) for path, _, _ in os.walk(directory))
+            results[backend] = {"write_s": write_seconds, "disk_mb": disk_mb, "scanned_mb": scanned_mb, **result}
+
+        print(f"{args.chunks} chunks, {args.dim} dimensions, {args.queries} queries, k={args.k}, noise={args.noise}")
+        print(f"{'backend':<14} {'write s':>8} {'open ms':>8} {'p50 ms':>7} {'p99 ms':>7} {'batch ms/q':>10} "
+              f"{'recall@' + str(args.k):>9} {'disk MB':>8} {'scan MB':>8} {'RSS MB':>7}")
+        for backend, result in results.items():
+            print(f"{backend:<14} {result['write_s']:>8.2f} {result['open_ms']:>8.1f} {result['p50_ms']:>7.2f} "
+                  f"{result['p99_ms']:>7.2f} {result['batch_query_ms']:>10.3f} {result['recall']:>9.3f} "
+                  f"{result['disk_mb']:>8.1f} {result['scanned_mb']:>8.1f} {result['peak_rss_mb']:>7.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
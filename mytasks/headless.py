@@ -0,0 +1,24 @@
+"""
+Configuration and helpers shared by the entry points that run without Streamlit
+(batch_quiz.py, quiz_service.py and its load test).
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMBED_CONFIG = {
+    "model_name": "textembedding-gecko@003",
+    "project": "quizify-428719",
+    "location": "europe-west2",
+}
+
+
+class LogNotifier:
+    """
+    Stands in for Streamlit's st.success/st.error so ChromaCollectionCreator reports to the log.
+    """
+    def success(self, message, icon=None):
+        logger.info(message)
+
+    def error(self, message, icon=None):
+        logger.error(message)
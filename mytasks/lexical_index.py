@@ -0,0 +1,174 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from telemetry import telemetry
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the their this to was were what "
+    "when where which who why how with about into than then there these those".split()
+)
+
+
+def tokenize(text) -> list:
+    """
+    Lowercased word tokens without stopwords, shared by indexing and querying.
+    """
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    A compact BM25 inverted index over the chunks of the Chroma collection, stored in SQLite
+    next to it: one (term, chunk ID, term frequency) posting per distinct term of a chunk,
+    plus each chunk's length. Chunk texts stay in Chroma and are fetched by ID.
+
+    Chunks are added and deleted by their deterministic IDs, so the index is updated
+    incrementally alongside the collection.
+    """
+    def __init__(self, db_path, k1=1.5, b=0.75):
+        """
+        :param db_path: Path of the SQLite database file. Created if missing.
+        :param k1: BM25 term frequency saturation.
+        :param b: BM25 document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, length INTEGER NOT NULL) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, chunk_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_by_chunk ON postings (chunk_id);"
+        )
+        self._conn.commit()
+        self._num_chunks, self._total_length = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+
+    def __len__(self):
+        return self._num_chunks
+
+    def add(self, chunks):
+        """
+        Indexes (chunk ID, text) pairs. Chunks already in the index are replaced.
+        """
+        chunks = list(chunks)
+        self.delete([chunk_id for chunk_id, _ in chunks])
+        chunk_rows, posting_rows = [], []
+        for chunk_id, text in chunks:
+            terms = Counter(tokenize(text))
+            length = sum(terms.values())
+            chunk_rows.append((chunk_id, length))
+            posting_rows += [(term, chunk_id, tf) for term, tf in terms.items()]
+
+        with self._lock:
+            self._conn.executemany("INSERT INTO chunks VALUES (?, ?)", chunk_rows)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", posting_rows)
+            self._conn.commit()
+            self._num_chunks += len(chunk_rows)
+            self._total_length += sum(length for _, length in chunk_rows)
+
+    def delete(self, chunk_ids):
+        """
+        Removes the given chunks from the index; unknown IDs are ignored.
+        """
+        chunk_ids = list(chunk_ids)
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                removed, removed_length = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE chunk_id IN ({placeholders})", batch
+                ).fetchone()
+                self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+                self._num_chunks -= removed
+                self._total_length -= removed_length
+            self._conn.commit()
+
+    def search(self, query, k=4) -> list:
+        """
+        Returns up to k (chunk ID, BM25 score, query term coverage) tuples, best first.
+        Coverage is the fraction of the query's distinct terms that occur in the chunk.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms or not self._num_chunks:
+            return []
+
+        placeholders = ",".join("?" * len(terms))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c USING (chunk_id) "
+                f"WHERE p.term IN ({placeholders})",
+                terms,
+            ).fetchall()
+            num_chunks, average_length = self._num_chunks, self._total_length / self._num_chunks
+
+        document_frequency = Counter(term for term, _, _, _ in rows)
+        scores, matched = {}, Counter()
+        for term, chunk_id, tf, length in rows:
+            idf = math.log(1 + (num_chunks - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            norm = tf + self.k1 * (1 - self.b + self.b * length / average_length)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            matched[chunk_id] += 1
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(chunk_id, score, matched[chunk_id] / len(terms)) for chunk_id, score in ranked]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves chunks by fusing BM25 and vector search rankings with reciprocal rank fusion.
+
+    When the lexical results are confident on their own, i.e. at least k chunks contain every
+    query term, they are returned directly and the query is never embedded.
+    """
+    vectorstore: object
+    lexical_index: object
+    k: int = 4
+    fetch_k: int = 20  # Candidates taken from each ranking before fusion
+    lexical_weight: float = 1.0
+    vector_weight: float = 1.0
+    rrf_k: int = 60  # Reciprocal rank fusion damping constant
+    lexical_only: bool = True  # Skip the vector search when the lexical results are confident
+
+    def _get_relevant_documents(self, query, *, run_manager: CallbackManagerForRetrieverRun) -> list:
+        lexical = self.lexical_index.search(query, self.fetch_k)
+        confident = [chunk_id for chunk_id, _, coverage in lexical if coverage >= 1.0]
+        if self.lexical_only and len(confident) >= self.k:
+            telemetry.incr("retrievals", path="lexical")
+            return self._documents_by_id(confident[:self.k])
+
+        telemetry.incr("retrievals", path="hybrid")
+        vector_docs = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        fused, by_id = {}, {}
+        for rank, (chunk_id, _, _) in enumerate(lexical):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + self.lexical_weight / (self.rrf_k + rank + 1)
+        for rank, doc in enumerate(vector_docs):
+            chunk_id = doc.metadata.get("chunk_id") or doc.page_content
+            by_id[chunk_id] = doc
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + self.vector_weight / (self.rrf_k + rank + 1)
+
+        top = sorted(fused, key=fused.get, reverse=True)[:self.k]
+        missing = self._documents_by_id([chunk_id for chunk_id in top if chunk_id not in by_id])
+        by_id.update((doc.metadata["chunk_id"], doc) for doc in missing)
+        return [by_id[chunk_id] for chunk_id in top if chunk_id in by_id]
+
+    def _documents_by_id(self, chunk_ids) -> list:
+        # A lookup by ID reads Chroma's storage directly, without embedding anything
+        if not chunk_ids:
+            return []
+        result = self.vectorstore.get(ids=chunk_ids, include=["documents", "metadatas"])
+        by_id = {
+            chunk_id: Document(page_content=text, metadata={**(metadata or {}), "chunk_id": chunk_id})
+            for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+        return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
@@ -0,0 +1,130 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+
+class PageCache:
+    """
+    A persistent, content-addressed cache of pages extracted from PDF uploads.
+
+    Each entry is keyed by the SHA-256 of the uploaded bytes and holds the extracted pages
+    (content and metadata) as a JSON Lines file in the cache directory, one page per line.
+    Entries are evicted in least-recently-used order once the directory grows past max_bytes.
+    """
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        """
+        :param cache_dir: Directory where cached pages are stored. Created if missing.
+        :param max_bytes: Upper bound on the total size of the cache directory in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def content_hash(data) -> str:
+        """
+        Returns the cache key for the given upload contents (bytes or any buffer).
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.jsonl")
+
+    def __contains__(self, key):
+        return os.path.exists(self._entry_path(key))
+
+    def get(self, key):
+        """
+        Returns the cached pages for the key as a list of Documents, or None on a miss.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f]
+            os.utime(path)  # Refresh the access time used for LRU eviction
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        from langchain_core.documents import Document
+        return [Document(page_content=entry["page_content"], metadata=entry["metadata"]) for entry in entries]
+
+    def put(self, key, pages):
+        """
+        Stores the pages under the key, then evicts old entries if over the size budget.
+        """
+        with self.writer(key) as write:
+            for page in pages:
+                write(page)
+
+    @contextlib.contextmanager
+    def writer(self, key):
+        """
+        Context manager yielding a write(page) function, so pages can be cached as they are
+        extracted. The entry only becomes visible once the block exits without an error.
+        """
+        # Write to a unique temporary file and rename so readers never see partial entries
+        temp_path = os.path.join(self.cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+        f = open(temp_path, "w", encoding="utf-8")
+
+        def write(page):
+            f.write(json.dumps({"page_content": page.page_content, "metadata": page.metadata}))
+            f.write("\n")
+
+        try:
+            yield write
+        except BaseException:
+            # Also covers a generator being closed before all pages were extracted
+            f.close()
+            os.unlink(temp_path)
+            raise
+        f.close()
+        os.replace(temp_path, self._entry_path(key))
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                # Entries from before pages were stored as JSON Lines are never read again
+                with contextlib.suppress(OSError):
+                    os.unlink(os.path.join(self.cache_dir, name))
+                continue
+            if not name.endswith(".jsonl"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue  # Removed by another process in the meantime
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters for this cache instance.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
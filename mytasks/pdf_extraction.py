@@ -0,0 +1,103 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# pypdf and LangChain's Document are imported on first extraction, not when the app starts
+
+
+def count_pages(data) -> int:
+    """
+    Returns the number of pages in the PDF held in data (bytes, or a file-like object read in place).
+    """
+    from pypdf import PdfReader
+    if hasattr(data, "read"):
+        data.seek(0)
+        return len(PdfReader(data).pages)
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def iter_pages(stream, source):
+    """
+    Lazily yields the pages of a PDF read from a file-like object, one Document at a time.
+
+    The stream is parsed in place (e.g. an uploaded file's BytesIO), so no copy of the
+    upload and no temporary file are needed.
+    """
+    from pypdf import PdfReader
+    from langchain_core.documents import Document
+    stream.seek(0)
+    reader = PdfReader(stream)
+    for page_number, page in enumerate(reader.pages):
+        yield Document(page_content=page.extract_text(), metadata={"source": source, "page": page_number})
+
+
+def extract_page_range(data, source, start, end) -> list:
+    """
+    Extracts the text of pages [start, end) from the PDF held in data.
+
+    Runs inside pool workers, so it returns plain (page_content, metadata) tuples that are
+    cheap to pickle. Metadata mirrors PyPDFLoader: the source name and the 0-based page number.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    return [
+        (reader.pages[page].extract_text(), {"source": source, "page": page})
+        for page in range(start, min(end, len(reader.pages)))
+    ]
+
+
+def parallel_extract(files, max_workers=None, pages_per_task=50, on_progress=None) -> list:
+    """
+    Extracts the pages of several PDFs on a process pool, splitting large files into page ranges.
+
+    :param files: A list of (source name, PDF bytes) pairs.
+    :param max_workers: Number of worker processes. Defaults to the number of CPUs.
+    :param pages_per_task: Maximum number of pages parsed by a single task.
+    :param on_progress: Optional callback(file_index, source, pages) called as each file completes.
+    :return: One list of Documents per input file, in input order and page order.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    # Plan the page-range tasks for every file
+    tasks = []
+    for file_index, (source, data) in enumerate(files):
+        num_pages = count_pages(data)
+        ranges = [(start, start + pages_per_task) for start in range(0, num_pages, pages_per_task)] or [(0, 0)]
+        tasks.extend((file_index, start, end) for start, end in ranges)
+
+    pending = [0] * len(files)
+    for file_index, _, _ in tasks:
+        pending[file_index] += 1
+    chunks = [{} for _ in files]
+
+    def collect(file_index, start, extracted):
+        chunks[file_index][start] = extracted
+        pending[file_index] -= 1
+        if pending[file_index] == 0 and on_progress:
+            on_progress(file_index, files[file_index][0], sum(len(chunk) for chunk in chunks[file_index].values()))
+
+    if max_workers == 1 or len(tasks) == 1:
+        # Not worth starting a pool; parse in-process
+        for file_index, start, end in tasks:
+            source, data = files[file_index]
+            collect(file_index, start, extract_page_range(data, source, start, end))
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            futures = {
+                executor.submit(extract_page_range, files[file_index][1], files[file_index][0], start, end): (file_index, start)
+                for file_index, start, end in tasks
+            }
+            for future in as_completed(futures):
+                file_index, start = futures[future]
+                collect(file_index, start, future.result())
+
+    # Reassemble each file's ranges in page order
+    from langchain_core.documents import Document
+    return [
+        [
+            Document(page_content=content, metadata=metadata)
+            for start in sorted(file_chunks)
+            for content, metadata in file_chunks[start]
+        ]
+        for file_chunks in chunks
+    ]
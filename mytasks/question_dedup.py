@@ -0,0 +1,204 @@
+import hashlib
+import math
+import random
+import re
+import threading
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Function words and the phrasing quiz questions share ("Which of the following statements about
+# ... is ..."), left out so questions are compared on their subject rather than their template.
+# Negation and polarity words change the answer, so they stay (see POLARITY_WORDS)
+TEMPLATE_WORDS = frozenset(
+    "a an the of in on at to for by with as and or is are was were be it its this that these those "
+    "which what who whom whose when where why how does do did following statement statements "
+    "describes describe about primary main function role one".split()
+)
+# Questions only count as duplicates if they use the same of these words: "Which is NOT a product of
+# glycolysis?" and "Which is a product of glycolysis?" differ in one word but have opposite answers
+POLARITY_WORDS = frozenset(
+    "not no never none except cannot isn aren doesn don true false correct incorrect untrue "
+    "best worst most least first last always".split()
+)
+
+
+def normalize(text) -> str:
+    """
+    Lowercases the text and reduces it to words separated by single spaces.
+    """
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def stem(text) -> str:
+    """
+    Returns the normalized text without TEMPLATE_WORDS, or the normalized text if nothing else is left.
+    """
+    text = normalize(text)
+    return " ".join(word for word in text.split() if word not in TEMPLATE_WORDS) or text
+
+
+def polarity(text) -> frozenset:
+    """
+    Returns the POLARITY_WORDS in the normalized text.
+    """
+    return frozenset(normalize(text).split()) & POLARITY_WORDS
+
+
+def shingles(text, size=5) -> set:
+    """
+    Returns the set of character shingles of the question's stem.
+    """
+    text = stem(text)
+    if len(text) <= size:
+        return {text}
+    return {text[index:index + size] for index in range(len(text) - size + 1)}
+
+
+def _stable_hash(value) -> int:
+    # Python's hash() is salted per process; MinHash signatures must be reproducible
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DuplicateIndex:
+    """
+    Detects near-duplicate questions in sub-linear time.
+
+    Every question is reduced to a MinHash signature of the character shingles of its stem
+    (the question without its template words) and stored in LSH buckets (one per band of the
+    signature), so a lookup only compares against questions that share a bucket. With an
+    embedding function, vectors are also bucketed by random hyperplane signatures and
+    paraphrases are caught by cosine similarity. Vectors are cached per text and can be passed
+    in when they were already computed elsewhere. Questions using different POLARITY_WORDS are
+    never duplicates, however similar.
+    """
+    def __init__(self, jaccard_threshold=0.6, num_perm=64, bands=16, shingle_size=5,
+                 embed_fn=None, cosine_threshold=0.92, hyperplane_bits=64, hyperplane_bands=8, seed=1):
+        """
+        :param jaccard_threshold: Estimated shingle Jaccard similarity at or above which two
+            questions are duplicates.
+        :param num_perm: Number of MinHash permutations; must be divisible by bands.
+        :param bands: Number of LSH bands. More bands find candidates at lower similarity.
+        :param shingle_size: Length of the character shingles.
+        :param embed_fn: Optional callable mapping a text to its embedding vector.
+        :param cosine_threshold: Cosine similarity at or above which two questions are duplicates.
+        :param hyperplane_bits: Length of the random hyperplane signature of a vector.
+        :param hyperplane_bands: Number of bands the hyperplane signature is split into.
+        :param seed: Seed for the hash permutations and hyperplanes.
+        """
+        if num_perm % bands or hyperplane_bits % hyperplane_bands:
+            raise ValueError("Signature length must be divisible by the number of bands.")
+        self.jaccard_threshold = jaccard_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.embed_fn = embed_fn
+        self.cosine_threshold = cosine_threshold
+        self.hyperplane_bits = hyperplane_bits
+        self.hyperplane_bands = hyperplane_bands
+
+        generator = random.Random(seed)
+        self._permutations = [
+            (generator.randrange(1, _MERSENNE_PRIME), generator.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._seed = seed
+        self._hyperplanes = None  # Created on first vector, once the dimension is known
+        self._signatures = []
+        self._polarities = []
+        self._vectors = []
+        self._buckets = {}
+        self._vector_buckets = {}
+        self._vector_cache = {}
+        self._last_signature = (None, None)  # A lookup is usually followed by add() of the same text
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _minhash(self, text):
+        last_text, last_signature = self._last_signature
+        if text == last_text:
+            return last_signature
+        hashes = [_stable_hash(shingle) for shingle in shingles(text, self.shingle_size)]
+        signature = tuple(min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in self._permutations)
+        self._last_signature = (text, signature)
+        return signature
+
+    def _bands(self, signature, bands):
+        rows = len(signature) // bands
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(bands)]
+
+    def _vector(self, text, vector=None):
+        if vector is None:
+            vector = self._vector_cache.get(text)
+        if vector is None and self.embed_fn is not None:
+            vector = self.embed_fn(text)
+        if vector is not None:
+            self._vector_cache[text] = vector
+        return vector
+
+    def _hyperplane_signature(self, vector):
+        if self._hyperplanes is None:
+            generator = random.Random(self._seed)
+            self._hyperplanes = [[generator.gauss(0.0, 1.0) for _ in vector] for _ in range(self.hyperplane_bits)]
+        return tuple(sum(p * v for p, v in zip(plane, vector)) >= 0 for plane in self._hyperplanes)
+
+    @staticmethod
+    def _cosine(a, b):
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def find_duplicate(self, text, vector=None):
+        """
+        Returns the index of a stored question that text duplicates, or None.
+
+        :param vector: Optional precomputed embedding of text, used instead of calling embed_fn.
+        """
+        signature, words = self._minhash(text), polarity(text)
+        with self._lock:
+            candidates = set()
+            for key in self._bands(signature, self.bands):
+                candidates.update(self._buckets.get(key, ()))
+            for candidate in sorted(candidates):
+                if self._polarities[candidate] != words:
+                    continue
+                stored = self._signatures[candidate]
+                agreement = sum(x == y for x, y in zip(signature, stored)) / self.num_perm
+                if agreement >= self.jaccard_threshold:
+                    return candidate
+
+        vector = self._vector(text, vector)
+        if vector is None:
+            return None
+        with self._lock:
+            if not self._vectors:
+                return None
+            candidates = set()
+            for key in self._bands(self._hyperplane_signature(vector), self.hyperplane_bands):
+                candidates.update(self._vector_buckets.get(key, ()))
+            for candidate in sorted(candidates):
+                stored = self._vectors[candidate]
+                if stored is not None and self._polarities[candidate] == words and self._cosine(vector, stored) >= self.cosine_threshold:
+                    return candidate
+        return None
+
+    def is_duplicate(self, text, vector=None) -> bool:
+        return self.find_duplicate(text, vector) is not None
+
+    def add(self, text, vector=None):
+        """
+        Stores a question so later lookups can match it.
+        """
+        signature = self._minhash(text)
+        vector = self._vector(text, vector)
+        with self._lock:
+            index = len(self._signatures)
+            self._signatures.append(signature)
+            self._polarities.append(polarity(text))
+            self._vectors.append(vector)
+            for key in self._bands(signature, self.bands):
+                self._buckets.setdefault(key, []).append(index)
+            if vector is not None:
+                for key in self._bands(self._hyperplane_signature(vector), self.hyperplane_bands):
+                    self._vector_buckets.setdefault(key, []).append(index)
+        return index
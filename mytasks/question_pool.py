@@ -0,0 +1,145 @@
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+
+from question_dedup import DuplicateIndex
+
+
+def normalize_topic(topic) -> str:
+    """
+    Normalizes a topic so trivially different spellings share a pool ("  Krebs  cycle!" -> "krebs cycle").
+    """
+    return " ".join(re.findall(r"\w+", (topic or "").lower()))
+
+
+class QuestionPool:
+    """
+    A persistent store of generated quiz questions, grouped into pools keyed by
+    (corpus fingerprint, normalized topic, prompt/model version).
+
+    Repeat requests for a topic are served by a random sample of the stored questions
+    instead of new LLM calls, once the pool holds min_pool_factor times the questions asked
+    for; until then each request generates a fresh quiz that tops the pool up, so repeat
+    quizzes are not drawn from the same few questions. Pools expire after ttl_seconds, the least recently used pools
+    are evicted beyond max_pools, and each pool keeps at most max_questions_per_pool questions.
+    """
+    def __init__(self, db_path, ttl_seconds=7 * 24 * 3600, max_pools=500, max_questions_per_pool=200, min_pool_factor=3):
+        """
+        :param db_path: Path of the SQLite database file. Created if missing.
+        :param ttl_seconds: Age after which a pool is no longer served and gets evicted.
+        :param max_pools: Maximum number of pools kept; least recently used ones are evicted.
+        :param max_questions_per_pool: Maximum number of questions kept per pool; oldest are dropped.
+        :param min_pool_factor: A quiz of N questions is only sampled from a pool holding at
+            least min_pool_factor * N questions.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_pools = max_pools
+        self.max_questions_per_pool = max_questions_per_pool
+        self.min_pool_factor = min_pool_factor
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS pools ("
+            "pool_key TEXT PRIMARY KEY, created REAL NOT NULL, last_used REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "pool_key TEXT NOT NULL REFERENCES pools(pool_key) ON DELETE CASCADE, "
+            "question_hash TEXT NOT NULL, question TEXT NOT NULL, added REAL NOT NULL, "
+            "PRIMARY KEY (pool_key, question_hash));"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def pool_key(corpus_fingerprint, topic, version) -> str:
+        return hashlib.sha256(f"{corpus_fingerprint}\0{normalize_topic(topic)}\0{version}".encode("utf-8")).hexdigest()
+
+    def sample(self, corpus_fingerprint, topic, version, count):
+        """
+        Returns count questions drawn at random from the pool, or None if the pool is missing,
+        expired or holds fewer than min_pool_factor * count questions. Pools collect questions
+        from several generations, so near-duplicates of a question already drawn are skipped
+        and others drawn instead; None is also returned if too few distinct ones are left.
+        """
+        key = self.pool_key(corpus_fingerprint, topic, version)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM pools WHERE pool_key = ?", (key,)).fetchone()
+            questions = []
+            if row and now - row[0] <= self.ttl_seconds:
+                questions = [
+                    json.loads(question)
+                    for (question,) in self._conn.execute("SELECT question FROM questions WHERE pool_key = ?", (key,))
+                ]
+
+        sampled = []
+        if len(questions) >= max(count, min(self.min_pool_factor * count, self.max_questions_per_pool)):
+            dedup_index = DuplicateIndex()
+            for question in random.sample(questions, len(questions)):
+                if not dedup_index.is_duplicate(question["question"]):
+                    dedup_index.add(question["question"])
+                    sampled.append(question)
+                    if len(sampled) == count:
+                        break
+
+        with self._lock:
+            if len(sampled) < count:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE pools SET last_used = ? WHERE pool_key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return sampled
+
+    def add(self, corpus_fingerprint, topic, version, questions):
+        """
+        Adds generated questions to the pool, then applies the size and age limits.
+        """
+        key = self.pool_key(corpus_fingerprint, topic, version)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM pools WHERE pool_key = ?", (key,)).fetchone()
+            if row and now - row[0] > self.ttl_seconds:
+                # An expired pool starts over rather than mixing in stale questions
+                self._conn.execute("DELETE FROM pools WHERE pool_key = ?", (key,))
+                row = None
+            if row:
+                self._conn.execute("UPDATE pools SET last_used = ? WHERE pool_key = ?", (now, key))
+            else:
+                self._conn.execute("INSERT INTO pools VALUES (?, ?, ?)", (key, now, now))
+
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO questions VALUES (?, ?, ?, ?)",
+                [
+                    (key, hashlib.sha256(question["question"].strip().lower().encode("utf-8")).hexdigest(), json.dumps(question), now)
+                    for question in questions
+                ],
+            )
+            self._conn.execute(
+                "DELETE FROM questions WHERE pool_key = ? AND rowid NOT IN "
+                "(SELECT rowid FROM questions WHERE pool_key = ? ORDER BY added DESC LIMIT ?)",
+                (key, key, self.max_questions_per_pool),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM pools WHERE created < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM pools WHERE pool_key NOT IN (SELECT pool_key FROM pools ORDER BY last_used DESC LIMIT ?)",
+            (self.max_pools,),
+        )
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters for this pool instance.
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / lookups if lookups else 0.0}
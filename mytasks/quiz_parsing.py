@@ -0,0 +1,100 @@
+import ast
+import json
+import re
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_ANSWER_KEY = re.compile(r"^\s*\(?([A-Da-d])\b")
+
+
+class QuestionParseError(ValueError):
+    """
+    Raised when an LLM response cannot be turned into quiz question objects.
+    """
+
+
+def repair_json(text) -> str:
+    """
+    Fixes the JSON defects LLMs commonly produce: surrounding code fences or prose, and
+    trailing commas before a closing bracket.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    # Keep only the outermost object or array
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if starts:
+        start = min(starts)
+        end = text.rfind("]" if text[start] == "[" else "}")
+        if end > start:
+            text = text[start:end + 1]
+
+    return _TRAILING_COMMA.sub(r"\1", text.strip())
+
+
+def parse_questions(text) -> list:
+    """
+    Parses an LLM response holding one question object or an array of them.
+
+    Strict JSON is tried first, then the repaired text, then the repaired text as a Python
+    literal (which accepts single-quoted strings).
+
+    :return: A list of question dicts (not yet schema-validated).
+    :raises QuestionParseError: If the response cannot be parsed.
+    """
+    try:
+        parsed = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        repaired = repair_json(text or "")
+        try:
+            parsed = json.loads(repaired)
+        except json.JSONDecodeError:
+            literal = re.sub(r"\btrue\b", "True", re.sub(r"\bfalse\b", "False", re.sub(r"\bnull\b", "None", repaired)))
+            try:
+                parsed = ast.literal_eval(literal)
+            except (ValueError, SyntaxError, MemoryError, RecursionError):
+                raise QuestionParseError("Response is not valid JSON") from None
+
+    if isinstance(parsed, dict):
+        # Accept {"questions": [...]} wrappers as well as a bare question object
+        parsed = parsed.get("questions", [parsed])
+    if not isinstance(parsed, list):
+        raise QuestionParseError("Response is not a JSON object or array")
+    return parsed
+
+
+def validate_schema(question):
+    """
+    Checks a parsed question against the quiz schema, normalizing the answer to a bare key
+    (e.g. "B) Paris" -> "B") in place.
+
+    :return: None if the question is valid, otherwise a description of the first problem.
+    """
+    if not isinstance(question, dict):
+        return "question is not an object"
+    if not isinstance(question.get("question"), str) or not question["question"].strip():
+        return "missing question text"
+
+    choices = question.get("choices")
+    if not isinstance(choices, list) or len(choices) != 4:
+        return "expected exactly 4 choices"
+    keys = []
+    for choice in choices:
+        if not isinstance(choice, dict) or not str(choice.get("key", "")).strip() or not str(choice.get("value", "")).strip():
+            return "choice without key or value"
+        keys.append(str(choice["key"]).strip())
+    if len(set(keys)) != 4:
+        return "choice keys are not unique"
+
+    answer = str(question.get("answer", "")).strip()
+    if answer not in keys:
+        match = _ANSWER_KEY.match(answer)
+        if not match or match.group(1).upper() not in keys:
+            return "answer key not among the choices"
+        answer = match.group(1).upper()
+    question["answer"] = answer
+
+    if not isinstance(question.get("explanation"), str) or not question["explanation"].strip():
+        return "missing explanation"
+    return None
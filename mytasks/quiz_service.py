@@ -0,0 +1,229 @@
+"""
+Asyncio HTTP service that generates quizzes from the indexed documents for other systems (e.g. an LMS).
+
+    python quiz_service.py --port 8080 --workers 4
+    curl -X POST localhost:8080/quiz -d '{"topic": "photosynthesis", "num_questions": 5}'
+
+Endpoints:
+    POST /quiz     {"topic": str, "num_questions": int (1-10), "mode": "single" | "batch"}
+    GET  /health   Liveness and current load.
+    GET  /metrics  Prometheus metrics from telemetry.
+
+Generations run on a bounded pool of worker threads. Once every worker is busy and
+max_pending more generations are queued, new generations are rejected with 503 and a
+Retry-After header instead of queueing without bound. Concurrent requests for the same
+(corpus, topic, question count, mode) share a single generation (singleflight), so
+they neither queue twice nor count against the limit twice.
+"""
+import argparse
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from headless import EMBED_CONFIG, LogNotifier
+from question_pool import QuestionPool, normalize_topic
+from task_4 import get_embedding_client
+from task_5 import VECTOR_BACKEND, ChromaCollectionCreator
+from task_8 import QUESTION_POOL_PATH, QuizGenerator
+from telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+MAX_QUESTIONS = 10
+
+
+class ServiceSaturated(Exception):
+    """
+    Raised when a new generation would exceed the service's worker and queue capacity.
+    """
+
+
+class QuizService:
+    """
+    Runs QuizGenerator on a worker thread pool for asyncio callers, with admission control and
+    singleflight coalescing of identical concurrent requests.
+
+    All bookkeeping happens on the event loop thread, so it needs no locks.
+    """
+    def __init__(self, creator, llm=None, pool=None, workers=4, max_pending=16):
+        """
+        :param creator: A ChromaCollectionCreator for the collections' directory, embedding model and
+            backend. Quizzes are drawn from the head collection, opened with its settings.
+        :param llm: Optional LLM for every QuizGenerator (e.g. fake_backends.FakeLLM); defaults to Vertex AI.
+        :param pool: Optional QuestionPool serving repeat topics without LLM calls.
+        :param workers: Number of quizzes generated at once.
+        :param max_pending: Number of generations allowed to wait for a worker before requests get 503.
+        """
+        self.creator = creator
+        self.llm = llm
+        self.pool = pool
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quiz-worker")
+        self.stats = {"requests": 0, "coalesced": 0, "rejected": 0, "generations": 0, "failed": 0}
+        self._inflight = {}  # generation key -> asyncio.Task shared by every request for it
+        self._collection = (None, None)  # Fingerprint of the head collection and a creator bound to it
+        self._manifest_mtime = None
+        self._reload_lock = asyncio.Lock()
+
+    @property
+    def active(self) -> int:
+        """
+        Generations running or waiting for a worker.
+        """
+        return len(self._inflight)
+
+    async def collection(self) -> tuple:
+        """
+        Returns the fingerprint of the head collection and a creator bound to it.
+
+        When the manifest changes, e.g. after the batch CLI published new documents, the new head
+        is opened on a separate creator in a background thread, so the event loop is not blocked.
+        Generations already admitted keep the creator of the corpus they are keyed under.
+        """
+        async with self._reload_lock:
+            mtime = self.creator.manifest_mtime()
+            if self._collection[0] is None or mtime != self._manifest_mtime:
+                self._collection = await asyncio.get_running_loop().run_in_executor(None, self._open_head)
+                self._manifest_mtime = mtime
+        return self._collection
+
+    def _open_head(self) -> tuple:
+        creator = ChromaCollectionCreator(
+            None, self.creator.embed_model, self.creator.persist_directory,
+            notifier=self.creator.notifier, backend=self.creator.backend,
+        )
+        creator.load_chroma_collection()
+        return creator.corpus_fingerprint(), creator
+
+    async def get_quiz(self, topic, num_questions, mode="single") -> dict:
+        """
+        Returns the quiz for the topic, joining an identical generation already in flight.
+
+        :raises ServiceSaturated: If a new generation is needed and the service is at capacity.
+        """
+        self.stats["requests"] += 1
+        fingerprint, creator = await self.collection()
+        key = (fingerprint, normalize_topic(topic), num_questions, mode)
+
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+            telemetry.incr("service_requests", outcome="coalesced")
+        else:
+            if self.active >= self.workers + self.max_pending:
+                self.stats["rejected"] += 1
+                telemetry.incr("service_requests", outcome="rejected")
+                raise ServiceSaturated()
+            telemetry.incr("service_requests", outcome="generated")
+            task = asyncio.ensure_future(self._generate(topic, num_questions, mode, fingerprint, creator))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded, so a disconnecting client does not cancel the generation other requests share
+        result = await asyncio.shield(task)
+        return {**result, "coalesced": coalesced}
+
+    async def _generate(self, topic, num_questions, mode, fingerprint, creator) -> dict:
+        self.stats["generations"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, self._generate_sync, topic, num_questions, mode, fingerprint, creator)
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+
+    def _generate_sync(self, topic, num_questions, mode, fingerprint, creator) -> dict:
+        generator = QuizGenerator(topic, num_questions, creator)
+        if self.llm is not None:
+            generator.llm = self.llm
+        if self.pool is not None:
+            questions = generator.generate_quiz_from_pool(self.pool, fingerprint, mode=mode)
+        else:
+            questions = generator.generate_quiz(mode=mode)
+        return {
+            "topic": topic,
+            "num_questions": num_questions,
+            "complete": len(questions) >= num_questions,
+            "questions": questions,
+            "stats": generator.stats,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_app(service) -> web.Application:
+    """
+    Builds the aiohttp application serving the given QuizService.
+    """
+    async def quiz(request):
+        try:
+            body = await request.json()
+            topic = str(body["topic"]).strip()
+            num_questions = int(body.get("num_questions", 5))
+            mode = body.get("mode", "single")
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"error": "expected a JSON body with a topic"}, status=400)
+        if not topic or not 1 <= num_questions <= MAX_QUESTIONS or mode not in ("single", "batch"):
+            return web.json_response(
+                {"error": f"topic must be non-empty, num_questions 1-{MAX_QUESTIONS} and mode single or batch"},
+                status=400,
+            )
+
+        try:
+            return web.json_response(await service.get_quiz(topic, num_questions, mode))
+        except ServiceSaturated:
+            return web.json_response({"error": "service saturated, retry later"}, status=503, headers={"Retry-After": "1"})
+        except Exception as e:
+            logger.error(f"Quiz generation failed for {topic!r}: {e}")
+            return web.json_response({"error": "quiz generation failed"}, status=500)
+
+    async def health(request):
+        return web.json_response({"status": "ok", "active": service.active, "capacity": service.workers + service.max_pending,
+                                  **service.stats})
+
+    async def metrics(request):
+        return web.Response(text=telemetry.prometheus_text(), content_type="text/plain")
+
+    async def on_cleanup(app):
+        service.close()
+
+    app = web.Application()
+    app.add_routes([web.post("/quiz", quiz), web.get("/health", health), web.get("/metrics", metrics)])
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve quiz generation over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Quizzes generated at once")
+    parser.add_argument("--max-pending", type=int, default=16, help="Generations queued before returning 503")
+    parser.add_argument("--persist-directory", help="Collection directory (defaults to the backend's)")
+    parser.add_argument("--backend", choices=["chroma", "flat"], default=VECTOR_BACKEND, help="Vector store backend")
+    parser.add_argument("--pool", action="store_true", help="Serve repeat topics from the question pool")
+    parser.add_argument("--fake", action="store_true", help="Use the offline fake backends")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.fake:
+        from fake_backends import FakeLLM, fake_embedding_client
+        embed_client, llm = fake_embedding_client(), FakeLLM()
+    else:
+        embed_client, llm = get_embedding_client(**EMBED_CONFIG), None
+
+    creator = ChromaCollectionCreator(None, embed_client, args.persist_directory, notifier=LogNotifier(), backend=args.backend)
+    if not creator.load_chroma_collection():
+        raise SystemExit(f"No indexed documents in {creator.persist_directory}; index some with batch_quiz.py first")
+
+    service = QuizService(
+        creator, llm=llm, pool=QuestionPool(QUESTION_POOL_PATH) if args.pool else None,
+        workers=args.workers, max_pending=args.max_pending,
+    )
+    web.run_app(create_app(service), host=args.host, port=args.port)
@@ -0,0 +1,121 @@
+"""
+Local load test of quiz_service against the offline fake backends.
+
+Indexes a few synthetic PDFs into a temporary Chroma collection, then for each worker count
+starts the service in-process and fires concurrent POST /quiz requests, a share of which
+repeat a topic already in flight. Reports throughput, latency percentiles, 503s and coalesced
+requests, showing how throughput scales with workers:
+
+    python quiz_service_load.py --workers 1 2 4 8 --requests 64 --concurrency 32 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from aiohttp import ClientSession, web
+
+from headless import LogNotifier
+from benchmark import make_synthetic_pdf, percentile
+from fake_backends import FakeLLM, fake_embedding_client
+from page_cache import PageCache
+from quiz_service import QuizService, create_app
+from task_3 import DocumentProcessor
+from task_5 import ChromaCollectionCreator
+
+
+def build_collection(persist_directory, files=3, pages=20) -> ChromaCollectionCreator:
+    processor = DocumentProcessor(cache=PageCache(os.path.join(persist_directory, "page_cache")), max_workers=1)
+    processor.process_files([(f"synthetic_{index}.pdf", make_synthetic_pdf(pages, seed=index)) for index in range(files)])
+    creator = ChromaCollectionCreator(processor, fake_embedding_client(), persist_directory, notifier=LogNotifier())
+    creator.create_chroma_collection()
+    return creator
+
+
+async def run_load(creator, workers, requests, concurrency, num_questions, duplicate_share, llm_latency, max_pending, seed=0) -> dict:
+    """
+    Serves the collection with the given number of workers and measures the given request load.
+    """
+    service = QuizService(creator, llm=FakeLLM(latency=llm_latency, seed=seed), workers=workers, max_pending=max_pending)
+    runner = web.AppRunner(create_app(service))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    # Some requests repeat a recent topic, as when a class opens the same quiz at once
+    generator = random.Random(seed)
+    topics = []
+    for index in range(requests):
+        if topics and generator.random() < duplicate_share:
+            topics.append(generator.choice(topics[-max(1, concurrency // 2):]))
+        else:
+            topics.append(f"topic {workers}-{index}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses, coalesced = [], {}, 0
+
+    async def fire(session, topic):
+        nonlocal coalesced
+        async with semaphore:
+            start = time.perf_counter()
+            async with session.post(f"http://127.0.0.1:{port}/quiz", json={"topic": topic, "num_questions": num_questions}) as response:
+                body = await response.json()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            coalesced += response.status == 200 and body["coalesced"]
+
+    start = time.perf_counter()
+    try:
+        async with ClientSession() as session:
+            await asyncio.gather(*(fire(session, topic) for topic in topics))
+    finally:
+        elapsed = time.perf_counter() - start
+        await runner.cleanup()
+
+    served = statuses.get(200, 0)
+    return {
+        "workers": workers,
+        "served": served,
+        "rejected": statuses.get(503, 0),
+        "errors": sum(count for status, count in statuses.items() if status not in (200, 503)),
+        "coalesced": coalesced,
+        "generations": service.stats["generations"],
+        "requests_per_s": served / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the quiz service against the fake backends.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to compare")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    parser.add_argument("--num-questions", type=int, default=3, help="Questions per quiz")
+    parser.add_argument("--duplicates", type=float, default=0.25, help="Share of requests repeating a recent topic")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM latency per call (s)")
+    parser.add_argument("--max-pending", type=int, default=64, help="Service queue limit before 503")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # Streamlit's bare-mode and LangChain deprecation warnings
+
+    workdir = tempfile.mkdtemp(prefix="quizify-load-")
+    try:
+        creator = build_collection(os.path.join(workdir, "chroma_db"))
+        print(f"{'workers':>7} {'served':>7} {'503s':>5} {'errors':>6} {'coalesced':>9} {'generations':>11} "
+              f"{'req/s':>7} {'p50 ms':>8} {'p99 ms':>8}")
+        for workers in args.workers:
+            result = asyncio.run(run_load(
+                creator, workers, args.requests, args.concurrency, args.num_questions,
+                args.duplicates, args.llm_latency, args.max_pending,
+            ))
+            print(f"{result['workers']:>7} {result['served']:>7} {result['rejected']:>5} {result['errors']:>6} "
+                  f"{result['coalesced']:>9} {result['generations']:>11} {result['requests_per_s']:>7.1f} "
+                  f"{result['p50_ms']:>8.0f} {result['p99_ms']:>8.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
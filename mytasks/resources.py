@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class ResourceRegistry:
+    """
+    A thread-safe, process-wide cache of expensive clients (embedding clients, LLMs, Chroma
+    handles), keyed by kind and configuration.
+
+    Streamlit re-runs the app script on every interaction but keeps imported modules, so a
+    registry at module level is shared by every rerun and every session of the server process.
+    """
+    def __init__(self):
+        self._resources = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._constructions = {}  # kind -> deque of recent construction timestamps
+        self._totals = {}  # kind -> number of constructions since start
+
+    @staticmethod
+    def _key(kind, config):
+        return kind, json.dumps(config, sort_keys=True, default=str)
+
+    def get(self, kind, config, factory):
+        """
+        Returns the resource of the given kind and config, constructing it with factory() on
+        first use. Concurrent first requests for the same key construct it only once.
+        """
+        key = self._key(kind, config)
+        with self._lock:
+            if key in self._resources:
+                return self._resources[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._resources:
+                    return self._resources[key]
+            resource = factory()
+            with self._lock:
+                self._resources[key] = resource
+                self._constructions.setdefault(kind, deque(maxlen=10000)).append(time.time())
+                self._totals[kind] = self._totals.get(kind, 0) + 1
+            return resource
+
+    def invalidate(self, kind=None, config=None):
+        """
+        Drops cached resources so the next get() constructs them again: one resource when kind
+        and config are given, every resource of a kind when only kind is given, else everything.
+        """
+        with self._lock:
+            if kind is not None and config is not None:
+                keys = [self._key(kind, config)]
+            else:
+                keys = [key for key in {**self._resources, **self._key_locks} if kind is None or key[0] == kind]
+            for key in keys:
+                self._resources.pop(key, None)
+                # A construction in progress holds its lock; get() re-creates it for later callers
+                self._key_locks.pop(key, None)
+
+    def stats(self, window=60.0) -> dict:
+        """
+        Returns, per kind, the number of cached resources, the total constructions and the
+        constructions within the last window seconds (per minute by default).
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                kind: {
+                    "cached": sum(1 for key in self._resources if key[0] == kind),
+                    "constructions": self._totals[kind],
+                    "recent_constructions": sum(1 for timestamp in timestamps if now - timestamp <= window),
+                }
+                for kind, timestamps in self._constructions.items()
+            }
+
+
+# Shared by every session in the server process
+registry = ResourceRegistry()
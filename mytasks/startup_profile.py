@@ -0,0 +1,129 @@
+"""
+Import-time profile of the app's entry points, with a cold-start budget.
+
+Imports each entry point in a fresh interpreter under python -X importtime, prints its slowest
+imports and what each deferred SDK costs when its stage first runs. Exits with status 1 if an
+entry point takes longer than the budget to import, or loads a deferred module at import time,
+so it can gate a deploy the way a test would:
+
+    python startup_profile.py --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = ("task_10",)
+# Loaded by the stage that first needs them, never at import: PDF extraction (pypdf, Document),
+# embedding and generation (Vertex AI), indexing and retrieval (vector stores, retrievers, prompts)
+DEFERRED_MODULES = (
+    "pypdf",
+    "langchain_core.documents",
+    "langchain_google_vertexai",
+    "google.cloud.aiplatform",
+    "langchain_community.vectorstores",
+    "chromadb",
+    "numpy",
+    "langchain_core.retrievers",
+    "langchain_core.prompts",
+)
+
+_CHILD = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "{statements}\n"
+    "print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}}))\n"
+)
+
+
+def profile_imports(*modules) -> dict:
+    """
+    Imports the modules, in order, in a fresh interpreter with -X importtime.
+
+    :return: A dict with the wall-clock "seconds" of the imports, the "modules" loaded
+        afterwards and the "cumulative_us" import time of every module imported.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [directory, os.environ.get("PYTHONPATH")]))}
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(statements="\n".join(f"import {module}" for module in modules))],
+        capture_output=True, text=True, cwd=directory, env=env,
+    )
+    if child.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{child.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in child.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and not line.endswith("imported package"):
+            _, total, name = line[len("import time:"):].split("|")
+            cumulative[name.strip()] = int(total)
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    return {**result, "cumulative_us": cumulative}
+
+
+def profile_entry_point(module, repeat=3) -> dict:
+    """
+    Profiles the cold import of an entry point, taking the median wall-clock time of repeat
+    fresh interpreters.
+
+    :return: The median "seconds", the "slowest" (module, cumulative ms) pairs and the deferred
+        modules loaded at import ("eager").
+    """
+    runs = [profile_imports(module) for _ in range(repeat)]
+    loaded = set(runs[0]["modules"])
+    slowest = sorted(runs[0]["cumulative_us"].items(), key=lambda item: item[1], reverse=True)
+    return {
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "slowest": [(name, us / 1000) for name, us in slowest if name != module],
+        "eager": [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+
+def deferred_costs(entry_point) -> dict:
+    """
+    Returns the extra import seconds each deferred module costs once the entry point is loaded,
+    i.e. what its stage pays on first use; None for modules that are not installed.
+    """
+    base = profile_imports(entry_point)["seconds"]
+    costs = {}
+    for module in DEFERRED_MODULES:
+        try:
+            costs[module] = max(0.0, profile_imports(entry_point, module)["seconds"] - base)
+        except RuntimeError:
+            costs[module] = None
+    return costs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the entry points' import time and enforce a cold-start budget.")
+    parser.add_argument("entry_points", nargs="*", default=list(ENTRY_POINTS), help="Modules to import")
+    parser.add_argument("--budget-ms", type=float, default=1000, help="Maximum cold import time per entry point")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per entry point (median is used)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--no-stages", action="store_true", help="Skip measuring the deferred modules' costs")
+    args = parser.parse_args()
+
+    failures = []
+    for entry_point in args.entry_points:
+        profile = profile_entry_point(entry_point, args.repeat)
+        print(f"{entry_point}: {profile['seconds'] * 1000:.0f} ms cold import (budget {args.budget_ms:.0f} ms)")
+        print("  slowest imports (cumulative ms):")
+        for name, ms in profile["slowest"][:args.top]:
+            print(f"    {ms:>8.1f}  {name}")
+
+        if not args.no_stages:
+            print("  deferred modules, extra ms when their stage first runs:")
+            for module, seconds in deferred_costs(entry_point).items():
+                print(f"    {'not installed' if seconds is None else f'{seconds * 1000:>8.1f}':>13}  {module}")
+
+        if profile["seconds"] * 1000 > args.budget_ms:
+            failures.append(f"{entry_point} took {profile['seconds'] * 1000:.0f} ms to import, over the {args.budget_ms:.0f} ms budget")
+        if profile["eager"]:
+            failures.append(f"{entry_point} imports deferred modules at startup: {', '.join(profile['eager'])}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
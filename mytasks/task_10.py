@@ -5,11 +5,17 @@ import json
 
 sys.path.append(os.path.abspath('../../'))
 from task_3 import DocumentProcessor
-from task_4 import EmbeddingClient
+from task_4 import get_embedding_client
 from task_5 import ChromaCollectionCreator
-from task_8 import QuizGenerator
+from task_8 import QUESTION_POOL_PATH, QuizGenerator
+from question_pool import QuestionPool
+from background_quiz import BackgroundQuiz
+from resources import registry
+from telemetry import telemetry
 from task_9 import QuizManager
 
+QUIZ_REFRESH_SECONDS = 2  # How often the quiz picks up questions still generating in the background
+
 def initialize_session_state():
     if "question_bank" not in st.session_state:
         st.session_state["question_bank"] = []
@@ -17,6 +23,12 @@ def initialize_session_state():
         st.session_state["display_quiz"] = False
     if "question_index" not in st.session_state:
         st.session_state["question_index"] = 0
+    if "background_quiz" not in st.session_state:
+        st.session_state["background_quiz"] = None
+    if "answered" not in st.session_state:
+        st.session_state["answered"] = None  # (question index, answer) of the last submitted answer
+    if "corpus_fingerprint" not in st.session_state:
+        st.session_state["corpus_fingerprint"] = None  # The corpus this session indexed
 
 if __name__ == "__main__":
                              
@@ -27,6 +39,17 @@ if __name__ == "__main__":
     }
     
     initialize_session_state()
+
+    # Prometheus scrape endpoint, started once per server process
+    metrics_port = os.environ.get("QUIZIFY_METRICS_PORT")
+    if metrics_port:
+        registry.get("metrics_server", {"port": int(metrics_port)}, lambda: telemetry.serve(int(metrics_port)))
+
+    # Shared client construction counts, to confirm reruns reuse the process-wide clients
+    with st.sidebar.expander("Resource stats"):
+        st.json(registry.stats())
+    with st.sidebar.expander("Pipeline metrics"):
+        st.json(telemetry.snapshot())
     
     if not st.session_state["question_bank"]:
         screen = st.empty()
@@ -40,58 +63,119 @@ if __name__ == "__main__":
                 processor = DocumentProcessor()
                 processor.ingest_documents()
             
-                embed_client = EmbeddingClient(**embed_config) 
+                embed_client = get_embedding_client(**embed_config)
             
                 chroma_creator = ChromaCollectionCreator(processor, embed_client)
+
+                # Warm start: reopen this session's corpus, or else the most recently published one.
+                # Uploads replace it by default, so sessions do not grow a shared corpus
+                try:
+                    warm_started = chroma_creator.load_chroma_collection(st.session_state["corpus_fingerprint"])
+                except ValueError as e:  # The directory holds another vector store backend's collections
+                    st.error(f"Cannot open the indexed documents: {str(e)}", icon="🚨")
+                    warm_started = False
+                if warm_started:
+                    indexed = chroma_creator.document_names()
+                    st.caption(f"{len(indexed)} documents already indexed: {', '.join(indexed)}")
+                    replace_documents = st.checkbox("Replace indexed documents with the uploaded PDFs", value=True)
+                else:
+                    replace_documents = True
                 
                 topic_input = st.text_input("Topic for Generative Quiz", placeholder="Enter the topic of the document")
                 questions = st.slider("Number of Questions", min_value=1, max_value=10, value=1)
+                generation_mode = st.radio(
+                    "Generation mode", ["single", "batch"], horizontal=True,
+                    help="single: one LLM call per question, in parallel. batch: one call for the whole quiz.",
+                )
                     
                 submitted = st.form_submit_button("Submit")
                 
                 if submitted:
-                    chroma_creator.create_chroma_collection()
-                        
+                    # New uploads are added to the collection; without any, use it as is
                     if len(processor.pages) > 0:
-                        st.write(f"Generating {questions} questions for topic: {topic_input}")
+                        if chroma_creator.create_chroma_collection(prune=replace_documents) is None:
+                            # The error is shown; the collection still open is the previous corpus
+                            st.stop()
+                        st.session_state["corpus_fingerprint"] = chroma_creator.fingerprint
+                    elif chroma_creator.db is None:
+                        st.error("No documents found!", icon="🚨")
+                        st.stop()
+                        
+                    st.write(f"Generating {questions} questions for topic: {topic_input}")
                     
+                    if st.session_state["background_quiz"] is not None:
+                        st.session_state["background_quiz"].cancel()
+
                     generator = QuizGenerator(topic_input, questions, chroma_creator)
-                    question_bank = generator.generate_quiz()
+                    # Generate in the background, serving repeat topics from the question pool,
+                    # and show the quiz as soon as the first question is ready
+                    background_quiz = BackgroundQuiz(
+                        generator,
+                        pool=registry.get("question_pool", {"path": QUESTION_POOL_PATH}, lambda: QuestionPool(QUESTION_POOL_PATH)),
+                        corpus_fingerprint=chroma_creator.corpus_fingerprint(),
+                        mode=generation_mode,
+                    ).start()
+                    question_bank = background_quiz.wait()
+                    if not question_bank:
+                        st.error("Failed to generate quiz questions. Please try again.", icon="🚨")
+                        st.stop()
                     
                     st.session_state["question_bank"] = question_bank
+                    st.session_state["background_quiz"] = background_quiz
                     st.session_state["display_quiz"] = True
                     st.session_state["question_index"] = 0
+                    st.session_state["answered"] = None
 
                     st.rerun()
 
     elif st.session_state["display_quiz"]:
-        question_bank = st.session_state["question_bank"]
+        background_quiz = st.session_state["background_quiz"]
+        refresh_every = None if background_quiz is None or background_quiz.done else QUIZ_REFRESH_SECONDS
 
-        screen = st.empty()
-        with screen.container():
-            st.header("Generated Quiz Question: ")
-            quiz_manager = QuizManager(question_bank)
-                
-            # Format the question and display it
-            with st.form("MCQ"):
-                index_question = quiz_manager.get_question_at_index(st.session_state["question_index"])
+        # While questions are still generating, the quiz re-renders on its own so they appear
+        # without the user interacting, and each refresh keeps the generation's heartbeat alive
+        @st.fragment(run_every=refresh_every)
+        def display_quiz():
+            question_bank = st.session_state["question_bank"]
 
-                # Unpack choices for radio button
-                choices = [f"{choice['key']}) {choice['value']}" for choice in index_question['choices']]
-                    
-                # Display the Question
-                st.write(f"{st.session_state['question_index'] + 1}. {index_question['question']}")
-                answer = st.radio("Choose an answer", choices, index=None)
-                    
-                answer_choice = st.form_submit_button("Submit")
-                
-                if answer_choice and answer is not None:
-                    correct_answer_key = index_question['answer']
-                    if answer.startswith(correct_answer_key):
-                        st.success("Correct!")
-                    else:
-                        st.error("Incorrect!")
-                    st.write(f"Explanation: {index_question['explanation']}")
-                
-                st.form_submit_button("Next Question", on_click=lambda: quiz_manager.next_question_index(1))
-                st.form_submit_button("Previous Question", on_click=lambda: quiz_manager.next_question_index(-1))
+            screen = st.empty()
+            with screen.container():
+                st.header("Generated Quiz Question: ")
+                # Picks up questions that finished generating since the last rerun
+                quiz_manager = QuizManager(question_bank, source=background_quiz)
+                if not quiz_manager.is_complete:
+                    st.caption(f"{quiz_manager.total_questions} questions ready, more are being generated...")
+
+                # Format the question and display it
+                with st.form("MCQ"):
+                    question_index = st.session_state["question_index"]
+                    index_question = quiz_manager.get_question_at_index(question_index)
+
+                    # Unpack choices for radio button
+                    choices = [f"{choice['key']}) {choice['value']}" for choice in index_question['choices']]
+
+                    # Display the Question
+                    st.write(f"{question_index + 1}. {index_question['question']}")
+                    answer = st.radio("Choose an answer", choices, index=None)
+
+                    answer_choice = st.form_submit_button("Submit")
+
+                    # The answer is kept in session state, so a refresh does not hide its feedback
+                    if answer_choice and answer is not None:
+                        st.session_state["answered"] = (question_index, answer)
+                    answered_index, answered = st.session_state["answered"] or (None, None)
+                    if answered_index == question_index:
+                        correct_answer_key = index_question['answer']
+                        if answered.startswith(correct_answer_key):
+                            st.success("Correct!")
+                        else:
+                            st.error("Incorrect!")
+                        st.write(f"Explanation: {index_question['explanation']}")
+
+                    st.form_submit_button("Next Question", on_click=lambda: quiz_manager.next_question_index(1))
+                    st.form_submit_button("Previous Question", on_click=lambda: quiz_manager.next_question_index(-1))
+
+            if refresh_every and quiz_manager.is_complete:
+                st.rerun()  # Stop refreshing once every question is in
+
+        display_quiz()
@@ -1,78 +1,188 @@
 # pdf_processing.py
 # Necessary imports
 import streamlit as st
-from langchain_community.document_loaders import PyPDFLoader
+import io
 import os
-import tempfile
-import uuid
+from page_cache import PageCache
+from pdf_extraction import count_pages, iter_pages, parallel_extract
+from telemetry import telemetry
+
+# Default location of the extracted-page cache, next to the persisted chroma_db
+PAGE_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'page_cache')
 
 
 class DocumentProcessor:
     """
     This class encapsulates the functionality for processing uploaded PDF documents using Streamlit
-    and Langchain's PyPDFLoader. It provides a method to render a file uploader widget, process the
+    and a pool of pypdf workers. It provides a method to render a file uploader widget, process the
     uploaded PDF files, extract their pages, and display the total number of pages extracted.
     """
-    def __init__(self):
+    def __init__(self, cache=None, max_workers=None, pages_per_task=50):
+        """
+        :param cache: Optional PageCache; defaults to one under PAGE_CACHE_DIR.
+        :param max_workers: Size of the PDF parsing process pool. Defaults to the number of CPUs.
+        :param pages_per_task: Page range size used to split large PDFs across workers.
+        """
         self.pages = []  # List to keep track of pages from all documents
+        # Content-addressed cache so re-uploaded PDFs are not parsed again
+        self.cache = cache if cache is not None else PageCache(PAGE_CACHE_DIR)
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
     
     def ingest_documents(self):
         """
         Renders a file uploader in a Streamlit app, processes uploaded PDF files,
         extracts their pages, and updates the self.pages list with the total number of pages.
-        
-        Given:
-        - Handling of temporary files with unique names to avoid conflicts.
-        
-        Your Steps:
-        1. Utilize the Streamlit file uploader widget to allow users to upload PDF files.
-           Hint: Look into st.file_uploader() with the 'type' parameter set to 'pdf'.
-        2. For each uploaded PDF file:
-           a. Generate a unique identifier and append it to the original file name before saving it temporarily.
-              This avoids name conflicts and maintains traceability of the file.
-           b. Use Langchain's PyPDFLoader on the path of the temporary file to extract pages.
-           c. Clean up by deleting the temporary file after processing.
-        3. Keep track of the total number of pages extracted from all uploaded documents.
-        
-        Example for generating a unique file name with the original name preserved:
-        ```
-        unique_id = uuid.uuid4().hex
-        temp_file_name = f"{original_name}_{unique_id}{file_extension}"
-        ```
+
+        Uploads already seen are served from the page cache. The remaining files are parsed
+        by process_files straight from the upload buffers, with a progress bar advancing as
+        each file completes.
         """
-        
-        # Step 1: Render a file uploader widget. Replace 'None' with the Streamlit file uploader code.
         # Render a file uploader widget
         uploaded_files = st.file_uploader("Upload PDF files", type=["pdf"], accept_multiple_files=True)
 
         # Process the uploaded file(s)
         if uploaded_files is not None:
-            for uploaded_file in uploaded_files:
-                # Generate a unique identifier to append to the file's original name
-                unique_id = uuid.uuid4().hex
-                original_name, file_extension = os.path.splitext(uploaded_file.name)
-                temp_file_name = f"{original_name}_{unique_id}{file_extension}"
-                temp_file_path = os.path.join(tempfile.gettempdir(), temp_file_name)
-
-                # Write the uploaded PDF to a temporary file
-                with open(temp_file_path, 'wb') as f:
-                    f.write(uploaded_file.getvalue())
-
-                # Step 2: Process the temporary file
-                #####################################
-                # Substep A: Use PyPDFLoader from Langchain to load the PDF and extract pages
-                pdf_loader = PyPDFLoader(temp_file_path)
-                pages = pdf_loader.load()
-
-                # Step 3: Then, Add the extracted pages to the 'pages' list.
-                #####################################
-                self.pages.extend(pages)
-
-                # Clean up by deleting the temporary file.
-                os.unlink(temp_file_path)
-            
+            files = [(uploaded_file.name, uploaded_file) for uploaded_file in uploaded_files]
+
+            progress_bar = st.progress(0.0) if files else None
+            completed = []
+
+            def on_progress(file_index, source, num_pages):
+                completed.append(file_index)
+                progress_bar.progress(len(completed) / len(files), text=f"Processed {source} ({num_pages} pages)")
+
+            self.process_files(files, on_progress=on_progress)
+
             # Display the total number of pages processed.
             st.write(f"Total pages processed: {len(self.pages)}")
+            cache_stats = self.cache.stats()
+            st.caption(f"Page cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+    def iter_documents(self, files, on_progress=None):
+        """
+        Lazily yields the pages of the given PDFs in input order, appending each to self.pages
+        as it is yielded, so callers can start on the first pages of a large PDF immediately.
+
+        Uploads are hashed and parsed in place from their buffers: no copy of the upload and
+        no temporary file is made. Parsed pages are written to the page cache as they stream.
+
+        :param files: A list of (file name, file-like object or bytes) pairs.
+        :param on_progress: Optional callback(file_index, source, pages) called as each file completes.
+        """
+        for file_index, (name, data) in enumerate(files):
+            cache_key, stream = self._open_upload(data)
+            cached_pages = self.cache.get(cache_key)
+            telemetry.incr("cache_lookups", cache="page", result="miss" if cached_pages is None else "hit")
+            num_pages = 0
+            for page in self._iter_file(name, cache_key, stream, cached_pages):
+                num_pages += 1
+                yield page
+            if cached_pages is None:
+                telemetry.incr("pages_parsed", num_pages)
+
+            if on_progress:
+                on_progress(file_index, name, num_pages)
+
+    def process_files(self, files, on_progress=None):
+        """
+        Extracts the pages of the given PDFs and appends them to self.pages in input order.
+
+        When more than one upload needs parsing, or one with more than pages_per_task pages,
+        the work is spread over a process pool in page ranges (which needs a bytes copy of each
+        upload to send to the workers). A single small upload is streamed in-process as in
+        iter_documents.
+
+        :param files: A list of (file name, file-like object or bytes) pairs.
+        :param on_progress: Optional callback(file_index, source, pages) called as each file completes,
+            in completion order.
+        """
+        opened = [self._open_upload(data) for _, data in files]
+        cached = [self.cache.get(cache_key) for cache_key, _ in opened]
+        misses = [file_index for file_index, pages in enumerate(cached) if pages is None]
+        telemetry.incr("cache_lookups", len(files) - len(misses), cache="page", result="hit")
+        telemetry.incr("cache_lookups", len(misses), cache="page", result="miss")
+
+        parsed = {}
+        parallel = self.max_workers != 1 and (
+            len(misses) > 1 or (len(misses) == 1 and count_pages(opened[misses[0]][1]) > self.pages_per_task)
+        )
+        if parallel:
+            def on_parsed(miss_index, source, num_pages):
+                if on_progress:
+                    on_progress(misses[miss_index], source, num_pages)
+
+            with telemetry.span("pdf_parse", files=len(misses), parallel=True) as span:
+                results = parallel_extract(
+                    [(files[file_index][0], self._upload_bytes(files[file_index][1])) for file_index in misses],
+                    max_workers=self.max_workers,
+                    pages_per_task=self.pages_per_task,
+                    on_progress=on_parsed,
+                )
+                span["pages"] = sum(len(pages) for pages in results)
+            telemetry.incr("pages_parsed", span["pages"])
+            parsed = dict(zip(misses, results))
+
+        for file_index, (name, _) in enumerate(files):
+            cache_key, stream = opened[file_index]
+            if file_index in parsed:
+                self.cache.put(cache_key, parsed[file_index])
+                self.pages.extend(self._tag_source(parsed[file_index], cache_key, name))
+                continue
+
+            if cached[file_index] is not None:
+                num_pages = sum(1 for _ in self._iter_file(name, cache_key, stream, cached[file_index]))
+            else:
+                with telemetry.span("pdf_parse", files=1, parallel=False) as span:
+                    num_pages = span["pages"] = sum(1 for _ in self._iter_file(name, cache_key, stream, None))
+                telemetry.incr("pages_parsed", num_pages)
+            if on_progress:
+                on_progress(file_index, name, num_pages)
+
+    def _iter_file(self, name, cache_key, stream, cached_pages):
+        """
+        Yields one upload's pages, from cached_pages if given or else parsed from the stream
+        and written to the cache, appending each page to self.pages.
+        """
+        if cached_pages is not None:
+            # Serve previously parsed uploads straight from the cache
+            for page in self._tag_source(cached_pages, cache_key, name):
+                self.pages.append(page)
+                yield page
+            return
+
+        with self.cache.writer(cache_key) as write:
+            for page in iter_pages(stream, name):
+                write(page)
+                page.metadata["source_hash"] = cache_key
+                self.pages.append(page)
+                yield page
+
+    @staticmethod
+    def _tag_source(pages, cache_key, name):
+        # The content hash identifies the document in the vector store's manifest; the name is
+        # the current upload's, as cached pages keep that of the first upload of the same bytes
+        for page in pages:
+            page.metadata["source_hash"] = cache_key
+            page.metadata["source"] = name
+            yield page
+
+    def _open_upload(self, data):
+        """
+        Returns the cache key of an upload and a stream to parse it from, without copying it.
+        """
+        if hasattr(data, "getbuffer"):
+            # Uploaded files are BytesIO objects: hash their buffer in place
+            with data.getbuffer() as buffer:
+                return self.cache.content_hash(buffer), data
+        return self.cache.content_hash(data), io.BytesIO(data)
+
+    @staticmethod
+    def _upload_bytes(data):
+        if hasattr(data, "getbuffer"):
+            with data.getbuffer() as buffer:
+                return bytes(buffer)
+        return bytes(data)
 
 if __name__ == "__main__":
     processor = DocumentProcessor()
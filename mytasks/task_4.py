@@ -1,6 +1,23 @@
-from langchain_google_vertexai import VertexAIEmbeddings
 import streamlit as st
+import logging
+import os
+import threading
+from embedding_batcher import BatchEmbedder
+from embedding_cache import EmbeddingCache
+from resources import registry
+from telemetry import telemetry
 
+# Initialize Logger instance
+_LOGGER = logging.getLogger(__name__)
+
+# Default location of the embedding cache, next to the persisted chroma_db
+EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', 'embedding_cache.sqlite3')
+
+
+class EmbeddingError(RuntimeError):
+    """
+    Raised by embed_documents when some documents could not be embedded after retries.
+    """
 
 class EmbeddingClient:
     """
@@ -15,14 +32,43 @@ class EmbeddingClient:
     - Pay attention to how each parameter is used to configure the embedding client.
     """
 
-    def __init__(self, model_name, project, location):
-        # Initialize the VertexAIEmbeddings client with the provided parameters
-        self.client = VertexAIEmbeddings(
-            model_name = "textembedding-gecko@003", 
-            project = "quizify-428719",
-            location = "europe-west2"
-        )
+    def __init__(self, model_name, project, location, cache=None, client=None, max_concurrency=4):
+        # Initialize the VertexAIEmbeddings client with the provided parameters,
+        # unless a client (e.g. fake_backends.FakeEmbeddings) is injected.
+        # The Vertex AI SDK is only imported, and the client built, on first use (see client)
+        self._client = client
+        self._client_config = {
+            "model_name": "textembedding-gecko@003",
+            "project": "quizify-428719",
+            "location": "europe-west2",
+        }
+        self._client_lock = threading.Lock()
+        self.model_name = client.model_name if client is not None else self._client_config["model_name"]
+        # Large document lists are embedded in concurrent, provider-sized batches
+        self.batcher = BatchEmbedder(lambda texts: self.client.embed_documents(texts), max_concurrency=max_concurrency)
+        # Embeddings are cached on disk, keyed by model and text hash
+        self.cache = cache if cache is not None else EmbeddingCache(EMBEDDING_CACHE_PATH)
+        self.upstream_calls = 0
+        self.saved_calls = 0  # Calls answered entirely from the cache
 
+    @property
+    def client(self):
+        """
+        The embedding client, constructed on first use so importing this module and creating an
+        EmbeddingClient stay cheap until something is actually embedded.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from langchain_google_vertexai import VertexAIEmbeddings
+                    self._client = VertexAIEmbeddings(**self._client_config)
+        return self._client
+
+    def _cache_key(self, task):
+        # Vertex embeds queries and documents with different task types, so cache them apart
+        return f"{self.model_name}:{task}"
+
+    @telemetry.traced("embed_query")
     def embed_query(self, query):
         """
         Uses the embedding client to retrieve embeddings for the given query.
@@ -30,25 +76,80 @@ class EmbeddingClient:
         :param query: The text query to embed.
         :return: The embeddings for the query or None if the operation fails.
         """
+        cached = self.cache.get_many(self._cache_key("query"), [query])[0]
+        telemetry.incr("cache_lookups", cache="embedding", result="miss" if cached is None else "hit")
+        if cached is not None:
+            self.saved_calls += 1
+            return cached
+
+        retries_before = self.batcher.retries
         try:
-            vectors = self.client.embed_query(query)
+            self.upstream_calls += 1
+            vectors = self.batcher.call_with_retries(self.client.embed_query, query)
+            self.cache.put_many(self._cache_key("query"), [query], [vectors])
             return vectors
         except Exception as e:
             print(f"Error embedding query: {e}")
             return None
+        finally:
+            telemetry.incr("retries", self.batcher.retries - retries_before, operation="embedding")
 
     def embed_documents(self, documents):
         """
-        Retrieve embeddings for multiple documents.
+        Retrieve embeddings for multiple documents. Only documents missing from the cache
+        are sent to the embedding client, in batches with retries.
 
         :param documents: A list of text documents to embed.
         :return: A list of embeddings for the given documents.
+        :raises EmbeddingError: If a batch still fails after retries. Successful batches are
+            cached, so a retry only embeds the rest.
         """
-        try:
-            return self.client.embed_documents(documents)
-        except AttributeError:
-            print("Method embed_documents not defined for the client.")
-            return None
+        vectors = self.cache.get_many(self._cache_key("document"), documents)
+        missing_texts = list(dict.fromkeys(documents[index] for index, vector in enumerate(vectors) if vector is None))
+        telemetry.incr("cache_lookups", len(documents) - sum(vector is None for vector in vectors), cache="embedding", result="hit")
+        telemetry.incr("cache_lookups", sum(vector is None for vector in vectors), cache="embedding", result="miss")
+        if not missing_texts:
+            self.saved_calls += 1
+            return vectors
+
+        requests_before, retries_before = self.batcher.requests, self.batcher.retries
+        with telemetry.span("embed", texts=len(missing_texts)):
+            embedded = self.batcher.embed(missing_texts)
+        self.upstream_calls += self.batcher.requests - requests_before
+        telemetry.incr("embedding_requests", self.batcher.requests - requests_before)
+        telemetry.incr("retries", self.batcher.retries - retries_before, operation="embedding")
+        self.cache.put_many(self._cache_key("document"), missing_texts, embedded)
+
+        embedded_by_text = dict(zip(missing_texts, embedded))
+        failed = 0
+        for index, vector in enumerate(vectors):
+            if vector is None:
+                vectors[index] = embedded_by_text[documents[index]]
+                failed += vectors[index] is None
+        if failed:
+            _LOGGER.error(f"Failed to embed {failed} of {len(documents)} documents.")
+            raise EmbeddingError(f"Failed to embed {failed} of {len(documents)} documents")
+        return vectors
+
+    def cache_stats(self) -> dict:
+        """
+        Returns the embedding cache hit ratio along with upstream, saved and retried call counts.
+        """
+        return {
+            **self.cache.stats(),
+            "upstream_calls": self.upstream_calls,
+            "saved_calls": self.saved_calls,
+            "retries": self.batcher.retries,
+            "failed_batches": self.batcher.failed_batches,
+        }
+
+def get_embedding_client(model_name, project, location) -> EmbeddingClient:
+    """
+    Returns the process-wide EmbeddingClient for this configuration, so Streamlit reruns and
+    sessions share one client instead of constructing and authenticating a new one each time.
+    """
+    config = {"model_name": model_name, "project": project, "location": location}
+    return registry.get("embedding_client", config, lambda: EmbeddingClient(**config))
 
 if __name__ == "__main__":
     model_name = "textembedding-gecko@003",
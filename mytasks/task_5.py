@@ -1,74 +1,659 @@
 import contextlib
+import hashlib
+import json
+import logging
 import os
+import shutil
+import socket
+import sqlite3
 import sys
-from google.cloud.aiplatform import base
+import threading
+import time
+import uuid
+import weakref
+from typing import TYPE_CHECKING
 import streamlit as st
 from task_3 import DocumentProcessor
-from task_4 import EmbeddingClient
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_core.documents import Document  # Import Document class
+from task_4 import get_embedding_client
+from chunking import OffsetChunker, materialize
+from resources import registry
+from telemetry import telemetry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# The vector stores, LangChain's retriever classes and the Vertex AI SDK are imported where
+# they are first used, so the app renders its first screen without loading them
+if TYPE_CHECKING:
+    from langchain_core.documents import Document  # Import Document class
+    from lexical_index import BM25Index
 
 # Initialize Logger instance
-_LOGGER = base.Logger(__name__)
+_LOGGER = logging.getLogger(__name__)
+
+# Default locations of the persisted collections and their manifest, per vector store backend
+CHROMA_DIR = os.path.join(os.path.dirname(__file__), '..', 'chroma_db')
+FLAT_DIR = os.path.join(os.path.dirname(__file__), '..', 'flat_db')
+# "chroma", or "flat" for the memory-mapped NumPy store of flat_store.py
+VECTOR_BACKEND = os.environ.get("QUIZIFY_VECTOR_BACKEND", "chroma")
+# Storage of new flat collections: "float32", or "float16"/"int8" quantized with full-precision rescoring
+VECTOR_DTYPE = os.environ.get("QUIZIFY_VECTOR_DTYPE", "float32")
+MANIFEST_NAME = "manifest.json"
+SEGMENTS_DIR = "segments"
+LEASES_DIR = "leases"
+LEXICAL_INDEX_NAME = "bm25.sqlite3"
+ADD_BATCH_SIZE = 1000  # Chunks per add_documents call, below Chroma's maximum batch size
+# Unused collections are garbage-collected, least recently used first, above this many MB on disk
+DISK_BUDGET_MB = float(os.environ.get("QUIZIFY_DISK_BUDGET_MB", "2048"))
+GC_GRACE_SECONDS = 3600  # Collections used (or segments written) more recently are never collected
+# A segment leased by a live process on this host is kept if the lease was refreshed this recently
+LEASE_SECONDS = 24 * 3600
+
+
+def _pid_alive(pid) -> bool:
+    if os.name == "nt":
+        return True  # os.kill would terminate the process; leases there expire after LEASE_SECONDS
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Lease file -> number of creators in this process that have its segment open
+_lease_counts = {}
+_lease_lock = threading.Lock()
+
+
+def _acquire_lease(path):
+    with _lease_lock:
+        _lease_counts[path] = _lease_counts.get(path, 0) + 1
+    with contextlib.suppress(OSError):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a"):
+            pass
+        os.utime(path)
+
+
+def _release_lease(path):
+    with _lease_lock:
+        count = _lease_counts.pop(path, 0) - 1
+        if count > 0:
+            _lease_counts[path] = count
+            return
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+def _copy_segment(source, destination, exclude=()):
+    """
+    Copies a collection segment, leaving out the top-level entries named in exclude. SQLite
+    databases are copied with the backup API, which takes a consistent snapshot (WAL included)
+    even while other processes have them open.
+    """
+    for directory, subdirectories, files in os.walk(source):
+        if directory == source:
+            subdirectories[:] = [name for name in subdirectories if name not in exclude]
+            files = [name for name in files if name not in exclude]
+        target = os.path.join(destination, os.path.relpath(directory, source))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            if name.endswith(("-wal", "-shm", "-journal", ".tmp", ".lock")):
+                continue
+            if name.endswith(".sqlite3"):
+                with contextlib.closing(sqlite3.connect(os.path.join(directory, name))) as src, \
+                        contextlib.closing(sqlite3.connect(os.path.join(target, name))) as dst:
+                    src.backup(dst)
+            else:
+                shutil.copy2(os.path.join(directory, name), os.path.join(target, name))
+
+
+def _last_used(directory) -> float:
+    # Readers touch a segment's directory when they open it; writers update its files
+    times = [os.stat(directory).st_mtime]
+    for path, _, files in os.walk(directory):
+        times += [os.stat(os.path.join(path, name)).st_mtime for name in files if os.path.exists(os.path.join(path, name))]
+    return max(times)
+
+
+def _directory_size(directory) -> int:
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for path, _, files in os.walk(directory) for name in files if os.path.exists(os.path.join(path, name))
+    )
+
 
 class ChromaCollectionCreator:
-    def __init__(self, processor, embed_model):
+    """
+    Indexes documents into per-corpus collections under persist_directory.
+
+    Every distinct set of documents (corpus, identified by its fingerprint) gets its own
+    collection in an immutable segment directory. Writers build a new segment, copied from
+    the collection they extend so unchanged chunks are not embedded again, then publish it
+    by atomically replacing the manifest, which maps fingerprints to segments and names the
+    most recently published corpus (the head). Readers only read the manifest and open a
+    segment, so they never wait on writers; writers take a file lock just to update the
+    manifest. Segments no longer in use are garbage-collected in the background once the
+    collections exceed DISK_BUDGET_MB.
+    """
+    def __init__(self, processor, embed_model, persist_directory=None, notifier=None, backend=None):
+        """
+        :param processor: The DocumentProcessor holding the pages to index.
+        :param embed_model: The embedding client used by the collection.
+        :param persist_directory: Directory of the collection segments and their manifest.
+            Defaults to CHROMA_DIR or FLAT_DIR depending on the backend.
+        :param notifier: Receives status messages through success(message, icon=...) and
+            error(message, icon=...). Defaults to Streamlit; headless callers pass a logger-backed one.
+        :param backend: Vector store backend, "chroma" or "flat". Defaults to VECTOR_BACKEND.
+        """
+        self.backend = backend or VECTOR_BACKEND
+        if self.backend not in ("chroma", "flat"):
+            raise ValueError(f"Unknown vector store backend: {self.backend}")
         self.processor = processor
         self.embed_model = embed_model
+        self.persist_directory = persist_directory or (CHROMA_DIR if self.backend == "chroma" else FLAT_DIR)
+        self.notifier = notifier if notifier is not None else st
+        self.chunker = OffsetChunker(chunk_size=1000, chunk_overlap=200, separator="\n\n")
         self.db = None
+        self.fingerprint = None  # Corpus of the open collection
+        self.sources = {}  # Documents of the open collection, keyed by source hash
+        self.segment_directory = None
+        self._lease_path = None  # This process' lease file on the open segment
+        self._lease = None  # Releases the lease when called or when the creator is collected
+
+    @staticmethod
+    def chunk_id(source_hash, page, start_index) -> str:
+        """
+        Deterministic ID of a chunk: the content hash of its document plus its page and offset.
+        """
+        return f"{source_hash}:{page}:{start_index}"
+
+    @staticmethod
+    def fingerprint_sources(source_hashes) -> str:
+        """
+        Returns the hash identifying a set of documents, which names its collection.
+        """
+        return hashlib.sha256("\n".join(sorted(source_hashes)).encode("utf-8")).hexdigest()
+
+    def _manifest_path(self):
+        return os.path.join(self.persist_directory, MANIFEST_NAME)
+
+    def manifest_mtime(self):
+        """
+        Returns the modification time of the manifest in nanoseconds, which changes whenever a
+        collection is published or garbage-collected, or None if nothing was published yet.
+        """
+        try:
+            return os.stat(self._manifest_path()).st_mtime_ns
+        except OSError:
+            return None
+
+    def _segment_path(self, segment):
+        # Collections persisted before segments existed live in persist_directory itself (segment "")
+        return os.path.join(self.persist_directory, SEGMENTS_DIR, segment) if segment else self.persist_directory
+
+    def read_manifest(self) -> dict:
+        """
+        Returns the manifest: the backend, the head fingerprint and, per fingerprint, the
+        collection's segment and documents. Reading never blocks, as writers replace the file atomically.
+        """
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"backend": self.backend, "head": None, "collections": {}}
+        if manifest.get("backend", "chroma") != self.backend:
+            raise ValueError(
+                f"{self.persist_directory} holds {manifest.get('backend', 'chroma')} collections, "
+                f"not {self.backend}; use another persist_directory"
+            )
+        if "collections" not in manifest:
+            # A single shared collection from before segments: adopt it as the head collection
+            sources = manifest.get("sources", {})
+            fingerprint = self.fingerprint_sources(sources) if sources else None
+            collections = {fingerprint: {"segment": "", "sources": sources}} if sources else {}
+            return {"backend": self.backend, "head": fingerprint, "collections": collections}
+        return manifest
+
+    @contextlib.contextmanager
+    def _manifest_lock(self):
+        # Serializes manifest updates across writer processes and threads; readers never take it
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with open(os.path.join(self.persist_directory, f"{MANIFEST_NAME}.lock"), "a+") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # LK_LOCK gives up after 10 seconds
+                        continue
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _save_manifest(self, manifest):
+        temp_path = f"{self._manifest_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._manifest_path())
 
-    def create_chroma_collection(self):
+    def load_manifest(self) -> dict:
+        """
+        Returns the documents of the open collection, or of the head collection if none is open,
+        keyed by source hash.
+        """
+        if self.fingerprint is not None:
+            return self.sources
+        manifest = self.read_manifest()
+        return manifest["collections"].get(manifest["head"], {}).get("sources", {})
+
+    def load_chroma_collection(self, fingerprint=None) -> bool:
+        """
+        Opens a published collection, so quizzes can be generated right away and new documents
+        indexed incrementally on top of it.
+
+        Only the manifest is read and the vector store opened; nothing is re-split or re-embedded.
+
+        :param fingerprint: The corpus to open. Defaults to, and falls back to if it has been
+            garbage-collected, the most recently published one.
+        :return: True if an existing collection was opened.
+        """
+        manifest = self.read_manifest()
+        if manifest["collections"].get(fingerprint) is None:
+            fingerprint = manifest["head"]
+        entry = manifest["collections"].get(fingerprint)
+        if not entry or not entry["sources"]:
+            return False
+        self._open_collection(fingerprint, entry)
+        return True
+
+    def document_names(self) -> list:
+        """
+        Returns the names of the documents stored in the collection.
+        """
+        return sorted(source["source"] for source in self.load_manifest().values())
+
+    def corpus_fingerprint(self) -> str:
+        """
+        Returns a hash identifying the set of documents stored in the collection.
+        """
+        return self.fingerprint or self.fingerprint_sources(self.load_manifest())
+
+    def _store_config(self, directory):
+        # Keyed on the embedding model rather than the client object, so clients rebuilt on a
+        # rerun still share the segment's handle instead of opening (and leaking) another one
+        return {
+            "backend": self.backend,
+            "persist_directory": os.path.realpath(directory),
+            "embed_model": getattr(self.embed_model, "model_name", type(self.embed_model).__name__),
+        }
+
+    def _open_store(self, directory):
+        # Vector store handles are shared across reruns and sessions, per segment and embedder
+        if self.backend == "flat":
+            from flat_store import FlatVectorStore
+            factory = lambda: FlatVectorStore(directory, self.embed_model, dtype=VECTOR_DTYPE)
+        else:
+            from langchain_community.vectorstores import Chroma
+            factory = lambda: Chroma(persist_directory=directory, embedding_function=self.embed_model)
+        return registry.get("vectorstore", self._store_config(directory), factory)
+
+    def _open_collection(self, fingerprint, entry):
+        segment_directory = self._segment_path(entry["segment"])
+        if segment_directory != self.segment_directory:
+            self._hold_lease(entry["segment"])
+        self.segment_directory = segment_directory
+        self._mark_used()
+        self.db = self._open_store(self.segment_directory)
+        self.fingerprint, self.sources = fingerprint, entry["sources"]
+        return self.db
+
+    def _hold_lease(self, segment):
+        # A process keeps one lease file per segment that some creator of it has open; it is
+        # removed once every such creator has moved to another segment or been dropped
+        if self._lease is not None:
+            self._lease()
+            self._lease_path, self._lease = None, None
+        if segment:  # A collection from before segments is never garbage-collected
+            self._lease_path = os.path.join(self.persist_directory, LEASES_DIR, f"{segment}@{socket.gethostname()}-{os.getpid()}")
+            _acquire_lease(self._lease_path)
+            self._lease = weakref.finalize(self, _release_lease, self._lease_path)
+
+    def _mark_used(self):
+        # Segments used within GC_GRACE_SECONDS are never garbage-collected, nor are those leased by
+        # a live reader; the lease is refreshed on use too
+        with contextlib.suppress(OSError):
+            os.utime(self.segment_directory)
+        if self._lease_path is not None:
+            with contextlib.suppress(OSError):
+                os.utime(self._lease_path)
+
+    def _leased_segments(self, now, grace_seconds) -> set:
+        """
+        Returns the segments leased by a live reader: a process on this host that is still running
+        and refreshed its lease within LEASE_SECONDS, or any process that refreshed it within
+        grace_seconds. Expired leases are deleted.
+        """
+        leases = os.path.join(self.persist_directory, LEASES_DIR)
+        if not os.path.isdir(leases):
+            return set()
+        hostname, leased = socket.gethostname(), set()
+        for name in os.listdir(leases):
+            segment, _, owner = name.partition("@")
+            host, _, pid = owner.rpartition("-")
+            try:
+                age = now - os.path.getmtime(os.path.join(leases, name))
+            except OSError:
+                continue
+            live = host == hostname and pid.isdigit() and _pid_alive(int(pid)) and age <= LEASE_SECONDS
+            if live or age <= grace_seconds:
+                leased.add(segment)
+            else:
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(leases, name))
+        return leased
+
+    def _ensure_open(self):
+        """
+        Re-opens the collection if another process garbage-collected its segment after it was
+        opened here; it falls back to the head collection if its corpus is gone from the manifest.
+        """
+        if self.segment_directory is None or os.path.isdir(self.segment_directory):
+            return
+        _LOGGER.warning(f"Segment {self.segment_directory} was removed; re-opening the collection")
+        registry.invalidate("vectorstore", self._store_config(self.segment_directory))
+        registry.invalidate("lexical_index", {"path": os.path.realpath(os.path.join(self.segment_directory, LEXICAL_INDEX_NAME))})
+        self.db, self.segment_directory = None, None
+        if not self.load_chroma_collection(self.fingerprint):
+            self.fingerprint, self.sources = None, {}
+            self._hold_lease("")
+
+    def _open_lexical_index(self, directory=None, db=None) -> "BM25Index":
+        from lexical_index import BM25Index
+        directory = directory or self.segment_directory
+        db = self.db if db is None else db
+        path = os.path.realpath(os.path.join(directory, LEXICAL_INDEX_NAME))
+        index = registry.get("lexical_index", {"path": path}, lambda: BM25Index(path))
+        if not len(index):
+            # Collections indexed before the lexical index existed are backfilled from the vector store once
+            stored = db.get(include=["documents"])
+            index.add(zip(stored["ids"], stored["documents"]))
+        return index
+
+    def chunk_spans(self) -> dict:
+        """
+        Chunks the processed pages into character spans without copying any text.
+
+        :return: A dict of chunk ID -> (page, ChunkSpan), in page order. Identical uploads
+            share chunk IDs, so each chunk appears once.
+        """
+        with telemetry.span("split", pages=len(self.processor.pages)) as span:
+            chunks = {}
+            for page, chunk in self.chunker.iter_chunks(self.processor.pages):
+                chunks.setdefault(self.chunk_id(chunk.doc_id, chunk.page, chunk.start), (page, chunk))
+            span["chunks"] = len(chunks)
+        return chunks
+
+    def split_pages(self) -> list:
+        """
+        Splits the processed pages into chunks, keeping each page's metadata plus the chunk's
+        start/end offsets and deterministic ID.
+        """
+        return [materialize(page, chunk, chunk_id) for chunk_id, (page, chunk) in self.chunk_spans().items()]
+
+    def create_chroma_collection(self, prune=True):
+        """
+        Indexes the processed pages into the collection of their corpus and publishes it.
+
+        The corpus is the processed documents, plus those of the open (or head) collection
+        unless prune is True. If that corpus is already published, its collection is simply
+        opened. Otherwise a new segment is built: when the corpus extends the open collection it
+        starts from a copy of it, so only new chunks are embedded and added and re-split chunks
+        are deleted; any other corpus starts from an empty segment.
+
+        :param prune: Leave out documents of the open collection that are not in processor.pages.
+        :return: A report dict with the number of chunks added, deleted and unchanged, the names
+            of the documents added and removed, and the corpus fingerprint. None if there is
+            nothing to index.
+        """
         try:
             # Step 1: Check for processed documents
             if len(self.processor.pages) == 0:
-                st.error("No documents found!", icon="🚨")
+                self.notifier.error("No documents found!", icon="🚨")
                 return
 
-            # Step 2: Split documents into text chunks
-            text_splitter = CharacterTextSplitter(
-                separator="\n\n",
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len,
-                is_separator_regex=False,
-            )
+            # Step 2: Split documents into text chunk spans; text is only copied for new chunks
+            chunks = self.chunk_spans()
+            self.notifier.success(f"Successfully split pages into {len(chunks)} documents!", icon="✅")
 
-            aux_array = list(map(lambda page: page.page_content, self.processor.pages))
-            texts = text_splitter.create_documents(aux_array)
+            # Step 3: Diff the chunks against the collection they extend
+            if self.fingerprint is None:
+                self.load_chroma_collection()
+            stored, base_directory = self.sources, self.segment_directory
+            current = {}
+            for chunk_id, (page, chunk) in chunks.items():
+                source = current.setdefault(chunk.doc_id, {"source": page.metadata["source"], "pages": 0, "chunk_ids": []})
+                source["chunk_ids"].append(chunk_id)
+                source["pages"] = max(source["pages"], chunk.page + 1)
 
-            if texts is not None:
-                st.success(f"Successfully split pages into {len(texts)} documents!", icon="✅")
+            sources = current if prune else {**stored, **current}
+            fingerprint = self.fingerprint_sources(sources)
+            if not stored.keys() <= sources.keys():
+                # The corpus does not extend the open collection, so its segment starts empty rather
+                # than carrying (and tombstoning) another corpus' chunks
+                stored, base_directory = {}, None
+            target_ids = {chunk_id for source in sources.values() for chunk_id in source["chunk_ids"]}
+            stored_ids = {chunk_id for source in stored.values() for chunk_id in source["chunk_ids"]}
+            new_ids = [chunk_id for chunk_id in chunks if chunk_id not in stored_ids]
+            # Stale chunks: from documents re-split into different chunks, or left out when pruning
+            stale_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in target_ids]
 
-            # Step 3: Create the Chroma Collection
-            self.db = Chroma.from_documents(texts, self.embed_model.client, persist_directory = os.path.join(os.path.dirname(__file__), '..', 'chroma_db'))
+            report = {
+                "added": len(new_ids),
+                "deleted": len(stale_ids),
+                "unchanged": len(target_ids) - len(new_ids),
+                "documents_added": [source["source"] for source_hash, source in current.items() if source_hash not in self.sources],
+                "documents_removed": [source["source"] for source_hash, source in self.sources.items() if source_hash not in sources],
+                "fingerprint": fingerprint,
+            }
 
+            entry = self.read_manifest()["collections"].get(fingerprint)
+            if entry is None:
+                # Step 4: Build the corpus' segment: copy the collection it extends (if any), embed and
+                # add only the new chunks, delete the stale ones, then publish it
+                entry = {"segment": f"{fingerprint[:16]}-{uuid.uuid4().hex[:8]}", "sources": sources}
+                self._build_segment(self._segment_path(entry["segment"]), base_directory, chunks, new_ids, stale_ids)
+                entry = self._publish(fingerprint, entry)
+            else:
+                # Another session or process already published this corpus; reuse its collection
+                report.update(added=0, deleted=0, unchanged=len(target_ids))
+                with self._manifest_lock():
+                    manifest = self.read_manifest()
+                    manifest["head"] = fingerprint
+                    self._save_manifest(manifest)
+            self._open_collection(fingerprint, entry)
+            self.collect_garbage_async()
 
             if self.db:
-                st.success("Successfully created Chroma Collection!", icon="✅")
+                self.notifier.success(
+                    f"Successfully updated Chroma Collection: {report['added']} chunks added, "
+                    f"{report['deleted']} deleted, {report['unchanged']} unchanged.",
+                    icon="✅",
+                )
             else:
-                st.error("Failed to create Chroma Collection!", icon="🚨")
+                self.notifier.error("Failed to create Chroma Collection!", icon="🚨")
+            return report
 
         except Exception as e:
             _LOGGER.error(f"Error occurred in create_chroma_collection: {str(e)}")
-            st.error(f"Error occurred: {str(e)}")
+            self.notifier.error(f"Error occurred: {str(e)}")
+
+    def _build_segment(self, directory, base_directory, chunks, new_ids, stale_ids):
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+        if base_directory:
+            # A collection from before segments shares persist_directory with the manifest and segments
+            with telemetry.span("segment_copy"):
+                _copy_segment(base_directory, directory, exclude={SEGMENTS_DIR, MANIFEST_NAME})
+        else:
+            os.makedirs(directory)
+
+        new_texts = [materialize(*chunks[chunk_id], chunk_id) for chunk_id in new_ids]
+        db = self._open_store(directory)
+        lexical_index = self._open_lexical_index(directory, db)
+        with telemetry.span("chroma_write", added=len(new_texts), deleted=len(stale_ids)):
+            for start in range(0, len(new_texts), ADD_BATCH_SIZE):
+                batch = new_texts[start:start + ADD_BATCH_SIZE]
+                db.add_documents(batch, ids=[text.metadata["chunk_id"] for text in batch])
+            if stale_ids:
+                db.delete(ids=stale_ids)
+                if hasattr(db, "compact"):
+                    db.compact(keep_previous=False)  # Drop the tombstoned rows before the segment is published
+        with telemetry.span("lexical_write", added=len(new_texts), deleted=len(stale_ids)):
+            lexical_index.add((text.metadata["chunk_id"], text.page_content) for text in new_texts)
+            lexical_index.delete(stale_ids)
+        telemetry.incr("chunks_written", len(new_texts))
+        telemetry.incr("chunks_deleted", len(stale_ids))
+
+    def _publish(self, fingerprint, entry) -> dict:
+        """
+        Adds a built segment to the manifest as the head collection, unless another writer
+        published the same corpus first, in which case that segment is kept and ours discarded.
+
+        :return: The manifest entry of the published collection.
+        """
+        with self._manifest_lock():
+            manifest = self.read_manifest()
+            published = manifest["collections"].get(fingerprint)
+            if published is None:
+                published = manifest["collections"][fingerprint] = {**entry, "published": time.time()}
+            manifest["head"] = fingerprint
+            self._save_manifest(manifest)
+        if published["segment"] != entry["segment"]:
+            self._discard_segment(self._segment_path(entry["segment"]))
+        telemetry.incr("segments_published")
+        return published
+
+    def _discard_segment(self, directory):
+        registry.invalidate("vectorstore", self._store_config(directory))
+        registry.invalidate("lexical_index", {"path": os.path.realpath(os.path.join(directory, LEXICAL_INDEX_NAME))})
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def collect_garbage(self, budget_mb=None, grace_seconds=GC_GRACE_SECONDS) -> list:
+        """
+        Deletes collections until the segments fit in the disk budget, least recently used
+        first. The head collection, the open one, collections used within grace_seconds and
+        those leased by a live reader in another process or session are kept. Segments missing
+        from the manifest (abandoned builds) are deleted once idle for grace_seconds. Readers
+        whose segment is deleted anyway re-open their collection on next use.
+
+        :param budget_mb: Disk budget of all segments. Defaults to DISK_BUDGET_MB.
+        :return: The fingerprints of the collections deleted.
+        """
+        budget = (DISK_BUDGET_MB if budget_mb is None else budget_mb) * 2 ** 20
+        segments_root = os.path.join(self.persist_directory, SEGMENTS_DIR)
+        if not os.path.isdir(segments_root):
+            return []
+        now = time.time()
+        with self._manifest_lock():
+            manifest = self.read_manifest()
+            referenced = {entry["segment"]: fingerprint for fingerprint, entry in manifest["collections"].items()}
+            leased = self._leased_segments(now, grace_seconds)
+            usage, orphans = [], []
+            for segment in os.listdir(segments_root):
+                directory = os.path.join(segments_root, segment)
+                last_used = _last_used(directory)
+                if segment not in referenced:
+                    if now - last_used > grace_seconds and segment not in leased:
+                        orphans.append(directory)
+                    continue
+                usage.append((last_used, segment, _directory_size(directory)))
+
+            total = sum(size for _, _, size in usage)
+            removed = []
+            for last_used, segment, size in sorted(usage):
+                fingerprint = referenced[segment]
+                if total <= budget:
+                    break
+                if fingerprint in (manifest["head"], self.fingerprint) or now - last_used <= grace_seconds or segment in leased:
+                    continue
+                del manifest["collections"][fingerprint]
+                removed.append((fingerprint, os.path.join(segments_root, segment)))
+                total -= size
+            if removed:
+                self._save_manifest(manifest)
+
+        # Segments are deleted after the manifest stops referencing them, so no new reader opens them
+        for _, directory in removed:
+            self._discard_segment(directory)
+        for directory in orphans:
+            self._discard_segment(directory)
+        if removed or orphans:
+            _LOGGER.info(f"Garbage-collected {len(removed)} collections and {len(orphans)} abandoned segments")
+            telemetry.incr("segments_collected", len(removed) + len(orphans))
+        return [fingerprint for fingerprint, _ in removed]
+
+    def collect_garbage_async(self):
+        """
+        Runs collect_garbage on a background thread, so publishing never waits for it.
+        """
+        def run():
+            try:
+                self.collect_garbage()
+            except Exception as e:
+                _LOGGER.error(f"Error occurred in collect_garbage: {str(e)}")
+        threading.Thread(target=run, name="collection-gc", daemon=True).start()
+
+    def as_retriever(self, hybrid=True, **kwargs):
+        """
+        Returns a retriever over the collection, or None if it has not been created or loaded.
 
-    def as_retriever(self):
-        return self.db.as_retriever() if self.db else None
+        :param hybrid: Fuse BM25 and vector search, answering from BM25 alone when it is confident.
+            Otherwise, or with search types other than similarity, a plain Chroma retriever is returned.
+        :param kwargs: Passed on to Chroma's as_retriever; search_kwargs["k"] sets the number of chunks.
+        """
+        self._ensure_open()
+        if not self.db:
+            return None
+        self._mark_used()
+        if not hybrid or kwargs.get("search_type", "similarity") != "similarity":
+            return self.db.as_retriever(**kwargs)
+        from lexical_index import HybridRetriever
+        return HybridRetriever(
+            vectorstore=self.db,
+            lexical_index=self._open_lexical_index(),
+            k=kwargs.get("search_kwargs", {}).get("k", 4),
+        )
 
-    def query_chroma_collection(self, query) -> Document:
+    def query_chroma_collection(self, query) -> "Document":
         try:
+            self._ensure_open()
             if self.db:
-                docs = self.db.similarity_search_with_relevance_scores(query)
+                with telemetry.span("retrieve"):
+                    docs = self.db.similarity_search_with_relevance_scores(query)
                 if docs:
                     return docs[0]
                 else:
-                    st.error("No matching documents found!", icon="🚨")
+                    self.notifier.error("No matching documents found!", icon="🚨")
             else:
-                st.error("Chroma Collection has not been created!", icon="🚨")
+                self.notifier.error("Chroma Collection has not been created!", icon="🚨")
         except Exception as e:
             _LOGGER.error(f"Error occurred in query_chroma_collection: {str(e)}")
-            st.error(f"Error occurred: {str(e)}")
+            self.notifier.error(f"Error occurred: {str(e)}")
 
 if __name__ == "__main__":
     try:
@@ -81,7 +666,7 @@ if __name__ == "__main__":
             "location": "europe-west2"
         }
 
-        embed_client = EmbeddingClient(**embed_config)
+        embed_client = get_embedding_client(**embed_config)
 
         chroma_creator = ChromaCollectionCreator(processor, embed_client)
 
@@ -3,7 +3,7 @@ import os
 import streamlit as st
 sys.path.append(os.path.abspath('../../'))
 from task_3 import DocumentProcessor
-from task_4 import EmbeddingClient
+from task_4 import get_embedding_client
 from task_5 import ChromaCollectionCreator
 
 f"""
@@ -59,7 +59,7 @@ if __name__ == "__main__":
 
         # 2) Initalize the EmbeddingClient from Task 4 with embed config
 
-        embed_client = EmbeddingClient(**embed_config) # Initialize from Task 4
+        embed_client = get_embedding_client(**embed_config) # Initialize from Task 4
 
         # 3) Initialize the ChromaCollectionCreator from Task 5
 
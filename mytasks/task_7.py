@@ -134,7 +134,7 @@ class QuizGenerator:
 if __name__ == "__main__":
     
     from task_3 import DocumentProcessor
-    from task_4 import EmbeddingClient
+    from task_4 import get_embedding_client
     from task_5 import ChromaCollectionCreator
     
     
@@ -150,7 +150,7 @@ if __name__ == "__main__":
         processor = DocumentProcessor()
         processor.ingest_documents()
     
-        embed_client = EmbeddingClient(**embed_config) # Initialize from Task 4
+        embed_client = get_embedding_client(**embed_config) # Initialize from Task 4
     
         chroma_creator = ChromaCollectionCreator(processor, embed_client)
 
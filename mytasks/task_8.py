@@ -1,21 +1,69 @@
 import streamlit as st
 import os
 import sys
+import hashlib
 import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 sys.path.append(os.path.abspath('../../'))
 from task_3 import DocumentProcessor
-from task_4 import EmbeddingClient
+from task_4 import get_embedding_client
 from task_5 import ChromaCollectionCreator
+from question_dedup import DuplicateIndex
+from quiz_parsing import QuestionParseError, parse_questions, validate_schema
+from resources import registry
+from telemetry import telemetry
 
-from langchain_core.prompts import PromptTemplate
-from langchain_google_vertexai import VertexAI
-from langchain_core.vectorstores import VectorStoreRetriever
+# LangChain's prompt classes and the Vertex AI SDK are imported when the first chain is built
+
+logger = logging.getLogger(__name__)
+
+# Default location of the persistent question pools, next to the persisted chroma_db
+QUESTION_POOL_PATH = os.path.join(os.path.dirname(__file__), '..', 'question_pool.sqlite3')
+
+LLM_CONFIG = {
+    "model_name": "gemini-pro",
+    "temperature": 0.8,  # Increased for less deterministic questions
+    "max_output_tokens": 500,
+}
+
+# Process-wide cap on LLM calls in flight, shared by every QuizGenerator
+MAX_CONCURRENT_LLM_CALLS = 8
+_LLM_SEMAPHORE = threading.BoundedSemaphore(MAX_CONCURRENT_LLM_CALLS)
+
+# Chunks retrieved once per quiz, and how many of them go into each question's context
+CONTEXT_POOL_SIZE = 12
+CONTEXT_SIZE = 4
+
+# Extra batch calls allowed by default to top up questions missing from a batch response
+MAX_BATCH_ROUNDS = 3
+
+
+class GenerationCancelled(Exception):
+    """
+    Raised inside a generation when its cancel_event is set.
+    """
+
+
+def estimate_tokens(text) -> int:
+    """
+    Rough token count (about 4 characters per token) used for generation statistics.
+    """
+    return len(text) // 4 + 1
 
 class QuizGenerator:
-    def __init__(self, topic=None, num_questions=1, vectorstore=None):
+    def __init__(self, topic=None, num_questions=1, vectorstore=None,
+                 similarity_threshold=0.6, embed_fn=None, cosine_threshold=0.92):
         """
         Initializes the QuizGenerator with a required topic, the number of questions for the quiz,
         and an optional vectorstore for querying related information.
+
+        :param similarity_threshold: Estimated shingle Jaccard similarity above which a question
+            counts as a near-duplicate of one already in the bank.
+        :param embed_fn: Optional text -> vector function enabling the embedding-cosine duplicate check.
+        :param cosine_threshold: Cosine similarity above which a question counts as a paraphrase.
         """
         self.topic = topic or "General Knowledge"
 
@@ -25,7 +73,20 @@ class QuizGenerator:
 
         self.vectorstore = vectorstore
         self.llm = None
+        self.chain = None  # Prompt | LLM chain, compiled once per generator
+        self.batch_chain = None  # Same, for the multi-question batch template
+        self.context_docs = None  # Chunks retrieved for the topic, cached per quiz
         self.question_bank = []  # Initialize the question bank to store questions
+        self._bank_lock = threading.Lock()  # Guards the question bank and stats when generating concurrently
+        self.stats = self._new_stats()  # LLM calls, estimated tokens and latency of the last quiz
+        self.on_question = None  # Optional callback(question) run as each question is accepted
+        self.cancel_event = None  # Optional threading.Event that stops generation when set
+        self.dedup_config = {
+            "jaccard_threshold": similarity_threshold,
+            "embed_fn": embed_fn,
+            "cosine_threshold": cosine_threshold,
+        }
+        self.dedup_index = DuplicateIndex(**self.dedup_config)  # Near-duplicate index over the question bank
         self.system_template = """
             You are a subject matter expert on the topic: {topic}
             
@@ -48,88 +109,303 @@ class QuizGenerator:
                 "explanation": "<explanation as to why the answer is correct>"
             }}
             
+            Context: {context}
+            """
+        self.batch_template = """
+            You are a subject matter expert on the topic: {topic}
+            
+            Follow the instructions to create {count} different quiz questions. For each question:
+            1. Generate a question based on the topic provided and context as key "question"
+            2. Provide 4 multiple choice answers to the question as a list of key-value pairs "choices"
+            3. Provide the correct answer for the question from the list of answers as key "answer"
+            4. Provide an explanation as to why the answer is correct as key "explanation"
+            
+            You must respond as a JSON array of {count} objects with the following structure:
+            [
+                {{
+                    "question": "<question>",
+                    "choices": [
+                        {{"key": "A", "value": "<choice>"}},
+                        {{"key": "B", "value": "<choice>"}},
+                        {{"key": "C", "value": "<choice>"}},
+                        {{"key": "D", "value": "<choice>"}}
+                    ],
+                    "answer": "<answer key from choices list>",
+                    "explanation": "<explanation as to why the answer is correct>"
+                }}
+            ]
+            
+            Do not repeat any of these questions: {exclude}
+            
             Context: {context}
             """
     
+    @property
+    def prompt_version(self) -> str:
+        """
+        Identifies the prompts and LLM settings, so pooled questions from older versions are not reused.
+        """
+        version = "\0".join([self.system_template, self.batch_template, json.dumps(LLM_CONFIG, sort_keys=True)])
+        return hashlib.sha256(version.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _new_stats(mode="single") -> dict:
+        return {
+            "mode": mode, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_seconds": 0.0,
+            "candidates": 0, "accepted": 0, "parse_errors": 0, "invalid": 0, "duplicates": 0, "wasted_tokens": 0,
+        }
+
     def init_llm(self):
         """
         Initializes and configures the Large Language Model (LLM) for generating quiz questions.
+        The client is shared process-wide, so only the first generator pays for its construction.
         """
-        self.llm = VertexAI(
-            model_name="gemini-pro",
-            temperature=0.8,  # Increased for less deterministic questions 
-            max_output_tokens=500
-        )
+        from langchain_google_vertexai import VertexAI
+        self.llm = registry.get("llm", LLM_CONFIG, lambda: VertexAI(**LLM_CONFIG))
 
-    def generate_question_with_vectorstore(self):
+    def build_chain(self):
         """
-        Generates a quiz question based on the topic provided using a vectorstore.
+        Compiles the PromptTemplate | LLM chain once, so questions only pay for the LLM call.
         """
         if not self.llm:
             self.init_llm()
+        if self.chain is None:
+            from langchain_core.prompts import PromptTemplate
+            self.chain = PromptTemplate.from_template(self.system_template) | self.llm
+            self.batch_chain = PromptTemplate.from_template(self.batch_template) | self.llm
+        return self.chain
+
+    def retrieve_context(self) -> list:
+        """
+        Retrieves the chunks related to the topic from the vectorstore. The topic is embedded and
+        searched once; later calls reuse the cached result until the next quiz.
+        """
         if not self.vectorstore:
             raise ValueError("Vectorstore not provided.")
-        
-        from langchain_core.runnables import RunnablePassthrough, RunnableParallel
-
-        # Enable a Retriever
-        retriever = self.vectorstore.as_retriever()
-        
-        # Use the system template to create a PromptTemplate
-        prompt = PromptTemplate.from_template(self.system_template)
-        
-        # RunnableParallel allows Retriever to get relevant documents
-        # RunnablePassthrough allows chain.invoke to send self.topic to LLM
-        setup_and_retrieval = RunnableParallel(
-            {"context": retriever, "topic": RunnablePassthrough()}
-        )
-        # Create a chain with the Retriever, PromptTemplate, and LLM
-        chain = setup_and_retrieval | prompt | self.llm 
-
-        # Invoke the chain with the topic as input
-        response = chain.invoke(self.topic)
-        return response
-
-    def generate_quiz(self) -> list:
+        if self.context_docs is None:
+            retriever = self.vectorstore.as_retriever(search_kwargs={"k": CONTEXT_POOL_SIZE})
+            with telemetry.span("retrieve", k=CONTEXT_POOL_SIZE):
+                self.context_docs = retriever.invoke(self.topic)
+        return self.context_docs
+
+    def context_for(self, index) -> str:
+        """
+        Returns the context for the index-th question: a window of CONTEXT_SIZE retrieved chunks,
+        shifted for every question so the questions draw on different parts of the documents.
+        """
+        docs = self.retrieve_context()
+        if len(docs) > CONTEXT_SIZE:
+            start = (index * CONTEXT_SIZE) % len(docs)
+            docs = (docs[start:] + docs[:start])[:CONTEXT_SIZE]
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    def generate_question_with_vectorstore(self, index=0):
+        """
+        Generates a quiz question based on the topic provided using a vectorstore.
+
+        :param index: Position of the question in the quiz, used to pick its slice of the context.
+        """
+        return self._generate_single(index)[0]
+
+    def generate_questions_batch(self, count):
+        """
+        Asks the LLM for count questions in a single call, sharing one copy of the instructions
+        and context. Questions already in the bank are listed so the LLM avoids repeating them.
+
+        :return: The raw LLM response, expected to be a JSON array of questions.
+        """
+        return self._generate_batch(count)[0]
+
+    def _generate_single(self, index):
+        chain = self.build_chain()
+        return self._invoke(chain, {"topic": self.topic, "context": self.context_for(index)})
+
+    def _generate_batch(self, count):
+        self.build_chain()
+        docs = self.retrieve_context()
+        exclude = "; ".join(question["question"] for question in self.question_bank) or "none"
+        context = "\n\n".join(doc.page_content for doc in docs)
+        return self._invoke(self.batch_chain, {"topic": self.topic, "count": count, "exclude": exclude, "context": context})
+
+    def _invoke(self, chain, inputs):
+        """
+        Invokes a chain and records the call's estimated prompt/completion tokens and latency.
+
+        :return: The response and the estimated tokens (prompt plus completion) it cost.
+        """
+        start = time.perf_counter()
+        with _LLM_SEMAPHORE:
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise GenerationCancelled()
+            with telemetry.span("llm_call", mode="batch" if "count" in inputs else "single"):
+                response = chain.invoke(inputs)
+        elapsed = time.perf_counter() - start
+
+        prompt_tokens = estimate_tokens(chain.first.format(**inputs))
+        completion_tokens = estimate_tokens(response)
+        telemetry.incr("llm_tokens", prompt_tokens, kind="prompt")
+        telemetry.incr("llm_tokens", completion_tokens, kind="completion")
+        with self._bank_lock:
+            self.stats["llm_calls"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["llm_seconds"] += elapsed
+        return response, prompt_tokens + completion_tokens
+
+    def generate_quiz(self, concurrent=True, mode="single", max_calls=None, max_tokens=None) -> list:
         """
         Generates a list of unique quiz questions based on the specified topic and number of questions.
+
+        Malformed responses are repaired where possible, and invalid or duplicate questions are
+        replaced with further calls until the quiz is complete or the call/token budget is spent.
+        Per-quiz success rate, retries and wasted tokens are recorded in self.stats.
+
+        :param concurrent: Issue the LLM calls in parallel (bounded by MAX_CONCURRENT_LLM_CALLS
+            across the process) instead of one after another. Only used in "single" mode.
+        :param mode: "single" makes one LLM call per question. "batch" asks for all missing
+            questions in one call per round.
+        :param max_calls: Budget of LLM calls for the quiz. Defaults to 3 calls per question in
+            "single" mode and 1 + MAX_BATCH_ROUNDS in "batch" mode.
+        :param max_tokens: Optional budget of estimated prompt plus completion tokens, checked
+            before each round of calls.
         """
+        if mode not in ("single", "batch"):
+            raise ValueError(f"Unknown generation mode: {mode}")
+        if max_calls is None:
+            max_calls = 3 * self.num_questions if mode == "single" else 1 + MAX_BATCH_ROUNDS
+
         self.question_bank = []  # Reset the question bank
+        self.dedup_index = DuplicateIndex(**self.dedup_config)
+        self.context_docs = None  # Retrieve fresh context once for this quiz
+        self.stats = self._new_stats(mode)
+        start = time.perf_counter()
+
+        # Build the chain and retrieve the context up front, so worker threads only call the LLM
+        self.build_chain()
+        self.retrieve_context()
 
-        for _ in range(self.num_questions):
-            question_str = self.generate_question_with_vectorstore()  # Generate question string
+        next_index = 0
+        try:
+            while True:
+                missing = self.num_questions - len(self.question_bank)
+                calls_left = max_calls - self.stats["llm_calls"]
+                tokens_used = self.stats["prompt_tokens"] + self.stats["completion_tokens"]
+                if missing <= 0 or calls_left <= 0 or (max_tokens is not None and tokens_used >= max_tokens):
+                    break
 
-            # Debugging: Output the raw response from LLM
-            print("Raw response from LLM:", question_str)
+                if mode == "batch":
+                    self._add_questions(*self._generate_batch(missing))
+                elif not concurrent:
+                    self._add_questions(*self._generate_single(next_index))  # Generate question string
+                    next_index += 1
+                else:
+                    # One round: request every missing question at once, within the call budget
+                    indexes = range(next_index, next_index + min(missing, calls_left))
+                    next_index = indexes.stop
+                    with ThreadPoolExecutor(max_workers=len(indexes)) as executor:
+                        futures = [executor.submit(self._generate_single, index) for index in indexes]
+                        for future in as_completed(futures):
+                            self._add_questions(*future.result())
+        except GenerationCancelled:
+            self.stats["cancelled"] = True
 
-            try:
-                question = json.loads(question_str)  # Convert JSON string to dictionary
-            except json.JSONDecodeError:
-                print("Failed to decode question JSON. Raw response was:")
-                print(question_str)  # Print the raw response for debugging
-                continue  # Skip this iteration if JSON decoding fails
+        first_round = self.num_questions if mode == "single" else 1
+        self.stats["retries"] = max(0, self.stats["llm_calls"] - first_round)
+        received = self.stats["candidates"] + self.stats["parse_errors"]
+        self.stats["success_rate"] = self.stats["accepted"] / received if received else 0.0
+        self.stats["wall_seconds"] = time.perf_counter() - start
+        telemetry.incr("retries", self.stats["retries"], operation="llm")
+        for outcome in ("accepted", "parse_errors", "invalid", "duplicates"):
+            telemetry.incr("questions", self.stats[outcome], outcome=outcome)
+        return self.question_bank
+
+    def generate_quiz_from_pool(self, pool, corpus_fingerprint, **kwargs) -> list:
+        """
+        Serves the quiz from a random sample of the question pool for this corpus and topic when
+        it holds enough questions; otherwise generates the quiz and adds it to the pool, unless
+        generation was cancelled or fell short of num_questions.
 
-            # Validate the question using the validate_question method
-            if self.validate_question(question):
-                print("Successfully generated unique question")
-                self.question_bank.append(question)  # Add the valid and unique question to the bank
-            else:
-                print("Duplicate or invalid question detected.")
+        :param pool: A QuestionPool.
+        :param corpus_fingerprint: Identifies the indexed documents, e.g. from
+            ChromaCollectionCreator.corpus_fingerprint().
+        :param kwargs: Passed on to generate_quiz.
+        """
+        sampled = pool.sample(corpus_fingerprint, self.topic, self.prompt_version, self.num_questions)
+        telemetry.incr("cache_lookups", cache="question_pool", result="miss" if sampled is None else "hit")
+        if sampled is not None:
+            self.question_bank = sampled
+            self.stats = {"mode": "pool", "llm_calls": 0}
+            return self.question_bank
 
+        self.generate_quiz(**kwargs)
+        if not self.stats.get("cancelled") and len(self.question_bank) >= self.num_questions:
+            pool.add(corpus_fingerprint, self.topic, self.prompt_version, self.question_bank)
         return self.question_bank
 
+    def _add_questions(self, response, tokens):
+        """
+        Parses a raw LLM response (one question or an array of them) and adds each valid,
+        unique question to the question bank until the quiz is complete. The tokens of a
+        response are counted as wasted in proportion to the questions rejected from it.
+        """
+        logger.debug(f"Raw response from LLM: {response}")
+
+        try:
+            with telemetry.span("json_parse"):
+                questions = parse_questions(response)
+        except QuestionParseError:
+            logger.warning(f"Failed to decode question JSON. Raw response was: {response}")
+            with self._bank_lock:
+                self.stats["parse_errors"] += 1
+                self.stats["wasted_tokens"] += tokens
+            return
+
+        rejected = 0
+        for question in questions:
+            if not self._accept_question(question):
+                rejected += 1
+        if questions:
+            with self._bank_lock:
+                self.stats["wasted_tokens"] += tokens * rejected // len(questions)
+
+    def _accept_question(self, question) -> bool:
+        # Validate and append atomically so concurrent duplicates cannot both get in
+        with self._bank_lock:
+            self.stats["candidates"] += 1
+            problem = validate_schema(question)
+            if problem:
+                logger.debug(f"Invalid question detected: {problem}")
+                self.stats["invalid"] += 1
+                return False
+            if len(self.question_bank) >= self.num_questions:
+                return False  # Surplus from a batch response; the quiz is already complete
+            if not self.validate_question(question):
+                logger.debug("Duplicate or invalid question detected.")
+                self.stats["duplicates"] += 1
+                return False
+
+            logger.debug("Successfully generated unique question")
+            self.question_bank.append(question)  # Add the valid and unique question to the bank
+            self.dedup_index.add(question["question"].strip())
+            self.stats["accepted"] += 1
+            if self.on_question:
+                self.on_question(question)
+            return True
+
     def validate_question(self, question: dict) -> bool:
         """
         Validates a quiz question for uniqueness within the generated quiz.
+
+        Exact and near-duplicates (paraphrases above the configured similarity thresholds) are
+        rejected by looking the question up in the dedup index rather than scanning the bank.
         """
         question_text = question.get("question", "").strip()
 
         if not question_text:
             return False  # Consider missing 'question' key as invalid in the dict object
 
-        for existing_question in self.question_bank:
-            if existing_question.get("question", "").strip() == question_text:
-                return False  # Duplicate question found
+        if self.dedup_index.is_duplicate(question_text):
+            return False  # Duplicate question found
 
         return True  # Unique question
 
@@ -148,7 +424,7 @@ if __name__ == "__main__":
         processor = DocumentProcessor()
         processor.ingest_documents()
     
-        embed_client = EmbeddingClient(**embed_config)  # Initialize from Task 4
+        embed_client = get_embedding_client(**embed_config)  # Initialize from Task 4
     
         chroma_creator = ChromaCollectionCreator(processor, embed_client)
     
@@ -3,7 +3,7 @@ import os
 import sys
 import logging
 from task_3 import DocumentProcessor
-from task_4 import EmbeddingClient
+from task_4 import get_embedding_client
 from task_5 import ChromaCollectionCreator
 from task_8 import QuizGenerator
 
@@ -16,9 +16,38 @@ logger = logging.getLogger(__name__)
 
 # QuizManager class definition
 class QuizManager:
-    def __init__(self, questions: list):
+    def __init__(self, questions: list, source=None):
+        """
+        :param questions: The questions available so far. New questions are appended to this list.
+        :param source: Optional BackgroundQuiz still generating questions for this quiz.
+        """
         self.questions = questions
+        self.source = source
         self.total_questions = len(questions)
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Picks up questions that finished generating in the background since the last call.
+
+        :return: The number of new questions.
+        """
+        if self.source is None:
+            return 0
+        self.source.heartbeat()
+        new_questions = self.source.poll()
+        self.questions.extend(new_questions)
+        self.total_questions = len(self.questions)
+        return len(new_questions)
+
+    @property
+    def is_complete(self) -> bool:
+        if self.source is None:
+            return True
+        if not self.source.done:
+            return False
+        self.refresh()  # Collect questions published just before generation ended
+        return True
 
     def get_question_at_index(self, index: int):
         valid_index = index % self.total_questions
@@ -78,7 +107,7 @@ if __name__ == "__main__":
             processor = DocumentProcessor()
             processor.ingest_documents()
         
-            embed_client = EmbeddingClient(**embed_config) 
+            embed_client = get_embedding_client(**embed_config) 
         
             chroma_creator = ChromaCollectionCreator(processor, embed_client)
         
@@ -0,0 +1,223 @@
+import atexit
+import contextlib
+import functools
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the span duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_PREFIX = "quizify"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_string(labels) -> str:
+    """
+    Renders (key, value) pairs as Prometheus labels, e.g. {cache="page",result="hit"}.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels)) + "}"
+
+
+class Telemetry:
+    """
+    Lightweight tracing and metrics for the ingestion and generation pipeline.
+
+    span() times a pipeline stage into a per-stage histogram and, when a trace path is set,
+    appends a JSONL record (sampled by sample_rate) with its duration, attributes and parent
+    span. incr() bumps labelled counters such as tokens, cache hits and retries. Everything
+    can be scraped as Prometheus text from serve(), or read with snapshot().
+
+    Recording a span costs two clock reads and an update under a lock, so it stays on in production.
+    """
+    def __init__(self, trace_path=None, sample_rate=1.0, buckets=DEFAULT_BUCKETS, flush_interval=1.0):
+        """
+        :param trace_path: Optional JSONL file that span records are appended to.
+        :param sample_rate: Fraction of spans written to the trace file. Metrics count every span.
+        :param buckets: Upper bounds in seconds of the span duration histogram buckets.
+        :param flush_interval: Seconds between flushes of the buffered trace file.
+        """
+        self.sample_rate = sample_rate
+        self.buckets = tuple(buckets)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._histograms = {}  # span name -> [bucket counts..., count, sum]
+        self._errors = {}  # span name -> number of spans that raised
+        self._counters = {}  # (name, sorted labels) -> value
+        self._span_ids = itertools.count(1)
+        self._local = threading.local()
+        self._trace_file = None
+        self._last_flush = time.monotonic()
+        if trace_path:
+            self._trace_file = open(trace_path, "a", encoding="utf-8")
+            atexit.register(self.flush)
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Times the enclosed block as a span of the given stage name. Attributes are written to
+        the trace record; the block may add more through the yielded dict.
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        span_id = next(self._span_ids)
+        parent = stack[-1] if stack else None
+        stack.append(span_id)
+        error = None
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            self._observe(name, elapsed, error)
+            if self._trace_file is not None and (self.sample_rate >= 1.0 or random.random() < self.sample_rate):
+                self._write({
+                    "ts": time.time(), "span": name, "seconds": round(elapsed, 6), "id": span_id,
+                    "parent": parent, "thread": threading.current_thread().name, "error": error, **attributes,
+                })
+
+    def traced(self, name):
+        """
+        Decorator recording every call of the function as a span, keeping its signature.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def incr(self, name, value=1, **labels):
+        """
+        Adds value to the counter with the given name and labels.
+        """
+        if not value:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name, elapsed, error):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if elapsed <= bound:
+                    histogram[index] += 1
+                    break
+            histogram[-2] += 1
+            histogram[-1] += elapsed
+            if error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    def _write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._trace_file.write(line)
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._trace_file.flush()
+                self._last_flush = now
+
+    def flush(self):
+        with self._lock:
+            if self._trace_file is not None and not self._trace_file.closed:
+                self._trace_file.flush()
+
+    def snapshot(self) -> dict:
+        """
+        Returns the span count, total and mean seconds and errors per stage, and all counters.
+        """
+        with self._lock:
+            spans = {
+                name: {
+                    "count": histogram[-2],
+                    "seconds": histogram[-1],
+                    "mean_seconds": histogram[-1] / histogram[-2] if histogram[-2] else 0.0,
+                    "errors": self._errors.get(name, 0),
+                }
+                for name, histogram in self._histograms.items()
+            }
+            counters = {name + _label_string(labels): value for (name, labels), value in self._counters.items()}
+        return {"spans": spans, "counters": counters}
+
+    def prometheus_text(self) -> str:
+        """
+        Renders the span histograms and counters in the Prometheus text exposition format.
+        """
+        histogram_name = f"{METRIC_PREFIX}_span_seconds"
+        lines = [f"# HELP {histogram_name} Duration of pipeline stages.", f"# TYPE {histogram_name} histogram"]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram):
+                    cumulative += count
+                    lines.append(f"{histogram_name}_bucket{_label_string([('le', bound), ('span', name)])} {cumulative}")
+                lines.append(f"{histogram_name}_bucket{_label_string([('le', '+Inf'), ('span', name)])} {histogram[-2]}")
+                lines.append(f"{histogram_name}_sum{_label_string([('span', name)])} {histogram[-1]}")
+                lines.append(f"{histogram_name}_count{_label_string([('span', name)])} {histogram[-2]}")
+
+            errors_name = f"{METRIC_PREFIX}_span_errors_total"
+            lines += [f"# TYPE {errors_name} counter"]
+            lines += [f"{errors_name}{_label_string([('span', name)])} {count}" for name, count in sorted(self._errors.items())]
+
+            for name in sorted({name for name, _ in self._counters}):
+                counter_name = f"{METRIC_PREFIX}_{name}_total"
+                lines.append(f"# TYPE {counter_name} counter")
+                for (key, labels), value in sorted(self._counters.items()):
+                    if key == name:
+                        lines.append(f"{counter_name}{_label_string(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """
+        Serves prometheus_text() at /metrics on a daemon thread.
+
+        :return: The running HTTP server; call shutdown() on it to stop serving.
+        """
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+
+# Shared by the whole pipeline. QUIZIFY_TRACE_PATH enables the JSONL trace file.
+telemetry = Telemetry(
+    trace_path=os.environ.get("QUIZIFY_TRACE_PATH"),
+    sample_rate=float(os.environ.get("QUIZIFY_TRACE_SAMPLE_RATE", "1.0")),
+)
@@ -0,0 +1,10 @@
+from fake_backends import compare_generation_modes
+
+
+def test_batch_mode_uses_fewer_calls_and_prompt_tokens():
+    results = compare_generation_modes(num_questions=5, latency=0.0, token_latency=0.0)
+    single, batch = results["single"], results["batch"]
+
+    assert single["questions"] == batch["questions"] == 5
+    assert batch["llm_calls"] < single["llm_calls"]
+    assert batch["prompt_tokens"] < single["prompt_tokens"]
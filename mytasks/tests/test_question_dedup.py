@@ -0,0 +1,24 @@
+from question_dedup import DuplicateIndex
+
+
+def test_distinct_templated_questions_both_survive():
+    index = DuplicateIndex()
+    index.add("Which of the following statements about the Krebs cycle is correct?")
+
+    assert not index.is_duplicate("Which of the following statements about glycolysis is correct?")
+
+
+def test_reworded_question_is_a_duplicate():
+    index = DuplicateIndex()
+    index.add("Which enzyme catalyzes the first step of glycolysis?")
+
+    assert index.is_duplicate("Which enzyme catalyses the first step in glycolysis?")
+
+
+def test_negated_and_opposite_questions_both_survive():
+    index = DuplicateIndex()
+    index.add("Which of the following is a product of glycolysis?")
+    index.add("Which of the following statements about the Krebs cycle is true?")
+
+    assert not index.is_duplicate("Which of the following is NOT a product of glycolysis?")
+    assert not index.is_duplicate("Which of the following statements about the Krebs cycle is false?")
@@ -0,0 +1,13 @@
+from fake_backends import FakeLLM, FakeVectorStore
+from task_8 import QuizGenerator
+
+
+def test_generate_question_without_generate_quiz():
+    store = FakeVectorStore([f"Passage {index} about photosynthesis." for index in range(4)])
+    generator = QuizGenerator("Photosynthesis", 1, store)
+    generator.llm = FakeLLM()
+
+    response = generator.generate_question_with_vectorstore()
+
+    assert '"question"' in response
+    assert generator.stats["llm_calls"] == 1
@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+import startup_profile
+
+
+def test_entry_points_import_within_budget():
+    # The same check that gates a deploy: cold import within the budget, no deferred SDKs loaded
+    check = subprocess.run(
+        [sys.executable, startup_profile.__file__, "--no-stages"],
+        capture_output=True, text=True, cwd=os.path.dirname(startup_profile.__file__),
+    )
+    assert check.returncode == 0, check.stdout + check.stderr